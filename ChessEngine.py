@@ -1,403 +1,434 @@
-import pygame as p
-import copy
+from diagnostics import GAME, RESULT, trace
+from bitboard import (
+    BitBoard,
+    Position,
+    PerftTable,
+    WHITE,
+    SQUARES,
+    PIECE_CODES,
+    EMPTY,
+    PAWN,
+    ROOK,
+    KING,
+    NORMAL,
+    SHORT_CASTLE,
+    LONG_CASTLE,
+    EN_PASSANT,
+    PROMOTION,
+    ALL_MOVES,
+    CASTLING_LETTERS,
+    SQUARE_NAMES,
+    encodeMove,
+    decodeMove,
+    moveToUci,
+    squareIndex,
+)
 
 
 class GameState:
-    def __init__(self, userPlaysWhite: bool = True):
+    def __init__(self, userPlaysWhite: bool = True, position: Position | None = None):
         """
         Initializes the GameState object with the starting board configuration,
         sets the initial turn to white, and initializes the move log.
 
+        :Parameters:
+        - userPlaysWhite: bool
+            True if the user plays the white pieces.
+        - position: Position | None
+            A snapshot to start from instead of the starting board, see fromPosition.
+
         :Attributes:
-        - board: list
-            A 2D list representing the chess board. Each element represents a square on the board.
-            The notation is as follows: 'bR' = black rook, 'wR' = white rook, '__' = empty square, etc.
+        - board: tuple
+            8 rows of 8 squares representing the chess board. Each element represents a square on
+            the board. The notation is as follows: 'bR' = black rook, 'wR' = white rook, '__' =
+            empty square, etc. Read only, it's rendered from the integer piece codes of the
+            bitboards when needed.
         - isWhiteTurn: bool
             Indicates whose turn it is; True if it's white's turn, False if black's.
         - moveLog: List["Move"]
             A log to keep track of all moves made in the game.
-        """
-        # Initialize the chess board as a 2D list. Each element represents a square on the board.
-        # The notation is as follows: 'bR' = black rook, 'wR' = white rook, '__' = empty square, etc.
-        print("----")
-        print("GAME START")
-        print("----")
-        self.board = [
-            ["bR", "bN", "bB", "bQ", "bK", "bN", "bN", "bR"],
-            ["bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"],
-            ["__", "__", "__", "__", "__", "__", "__", "__"],
-            ["__", "__", "__", "__", "__", "__", "__", "__"],
-            ["__", "__", "__", "__", "__", "__", "__", "__"],
-            ["__", "__", "__", "__", "__", "__", "__", "__"],
-            ["wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"],
-        ]
+        - bitboard: BitBoard
+            The bitboard copy of the board that the move generation runs on.
+        - legalMoves: list[int]
+            The valid moves of the current player packed into integers, see bitboard.encodeMove,
+            generated on first access of possibleMoves, legalMoves or gameUpdate after a push or
+            pop.
+        - possibleMoves: set
+            The same moves as ((end row, end col), (start row, start col)) tuples for the GUI,
+            only built from legalMoves when read.
+        - gameUpdate: str
+            "GG" for checkmate, "SM" for stalemate, "TR" for a draw by threefold repetition, "FM"
+            for a draw by the fifty-move rule and "" otherwise, worked out with legalMoves.
+        """
+        self.needsRefresh = False
+        self.legalMoves = []
         self.possibleMoves = set()
-        self.opponentMoves = set()
+        self.gameUpdate = ""
+        # The bitboards also hold the castling rights, en passant square and fifty-move counter.
+        if position is None:
+            # Initialize the chess board as a 2D list. Each element represents a square on the
+            # board. The notation is as follows: 'bR' = black rook, 'wR' = white rook, '__' =
+            # empty square, etc.
+            trace(GAME, "----\nGAME START\n----")
+            board = [
+                ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+                ["bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"],
+                ["__", "__", "__", "__", "__", "__", "__", "__"],
+                ["__", "__", "__", "__", "__", "__", "__", "__"],
+                ["__", "__", "__", "__", "__", "__", "__", "__"],
+                ["__", "__", "__", "__", "__", "__", "__", "__"],
+                ["wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"],
+                ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"],
+            ]
+            self.bitboard = BitBoard(board)
+        else:
+            self.bitboard = BitBoard.fromPosition(position)
         # Indicates whose turn it is; True if it's white's turn, False if black's.
-        self.isWhiteTurn = True
+        self.isWhiteTurn = self.bitboard.color == WHITE
         # A log to keep track of all moves made in the game.
         self.moveLog: list["Move"] = []
-        self.castleRightsLog: list[tuple[list[bool]]] = []
-        self.enPassantLog: list[str] = []
-        self.enPassantPlace: str = "-"
-        # castle rights (whiteCastleRights, blackCastleRights)
-        self.whiteCastleRights = [
-            True,
-            True,
-            False,
-            False,
-            False,
-        ]  # Queen Side, King Side, Left Rook Moved, King Moved, Right Rook Moved
-        self.blackCastleRights = [
-            True,
-            True,
-            False,
-            False,
-            False,
-        ]  # Queen Side, King Side, Left Rook Moved, King Moved, Right Rook Moved
-        self.fiftyMoveRule = 0  # counter for 50 move rule
         self.isInCheck = False  # is in check
         self.userPlaysWhite = userPlaysWhite
+        # The string board, rendered on demand after every push or pop.
+        self.boardView: tuple | None = None
+        # possibleMoves and gameUpdate are generated lazily, see refresh.
+        self.needsRefresh = True
 
-        #
-        self.isWhiteTurn = not self.isWhiteTurn
-        kingPos = self.posOfPiece("wK" if self.isWhiteTurn else "bK")[0]
-        self.updateCastlingRights(kingPos)
-        self.isWhiteTurn = not self.isWhiteTurn
-        self.gameUpdate = self.genValidMoves(self.board)
-
-    def genValidMoves(self, board: list) -> str:
+    @classmethod
+    def fromPosition(cls, position: Position, userPlaysWhite: bool = True) -> "GameState":
         """
-        Generates all valid moves for the current player, accounting for checks and checkmates.
+        Builds a GameState from a snapshot, see snapshot. The move log starts out empty.
 
         :Parameters:
-        - board: list
-            The current board state.
+        - position: Position
+            The snapshot to start from.
+        - userPlaysWhite: bool
+            True if the user plays the white pieces.
+
+        :Returns:
+        - GameState: A new game in the position of the snapshot.
+        """
+        return cls(userPlaysWhite, position)
+
+    @classmethod
+    def fromFEN(cls, fen: str, userPlaysWhite: bool = True) -> "GameState":
+        """
+        Builds a GameState from a full FEN string, see FEN.FENtoPosition.
+        """
+        return cls.fromPosition(FEN.FENtoPosition(fen), userPlaysWhite)
+
+    def snapshot(self) -> Position:
+        """
+        Returns an immutable snapshot of the current position for branching analysis or other
+        processes, cheaper than copying the GameState.
+        """
+        return self.bitboard.snapshot()
+
+    @property
+    def board(self) -> tuple:
+        """
+        The string board, rendered from the bitboards after every push or pop. The rows are
+        tuples so it can't be edited by mistake, a different position goes through fromPosition
+        or fromFEN.
+        """
+        if self.boardView is None:
+            self.boardView = tuple(map(tuple, self.bitboard.toBoard()))
+        return self.boardView
+
+    @property
+    def legalMoves(self) -> list[int]:
+        if self.needsRefresh:
+            self.refresh()
+        return self.packedMoves
+
+    @legalMoves.setter
+    def legalMoves(self, moves: list[int]) -> None:
+        self.packedMoves = moves
+
+    @property
+    def possibleMoves(self) -> set:
+        if self.needsRefresh:
+            self.refresh()
+        if self.validMoves is None:
+            self.validMoves = self.genPossibleMoves()
+        return self.validMoves
+
+    @possibleMoves.setter
+    def possibleMoves(self, moves: set) -> None:
+        self.validMoves = moves
+
+    @property
+    def gameUpdate(self) -> str:
+        if self.needsRefresh:
+            self.refresh()
+        return self.status
+
+    @gameUpdate.setter
+    def gameUpdate(self, status: str) -> None:
+        self.status = status
+
+    def refresh(self) -> None:
+        """
+        Generates the valid moves and the game status of the current position.
+        """
+        self.gameUpdate = self.genValidMoves()
+
+    def genValidMoves(self) -> str:
+        """
+        Generates all valid moves for the current player, accounting for checks and checkmates.
 
         :Returns:
-        - list: A list of valid moves.
-        """
-        if self.fiftyMoveRule == 100:
-            pass  # TODO: ask the user if they want to withdraw!
-        self.genOpponentMoves(self.board)
-        # Get the position of the current player's king.
-        self.kingPosition = self.posOfPiece("wK" if self.isWhiteTurn else "bK")[0]
-        # Generate all possible moves (not necessarily valid).
-        self.possibleMoves = self.genPossibleMoves(board)
-        # Check if the king is in check.
-        toDelete = self.checkAroundKing(self.kingPosition)
+        - str: The game status, see gameUpdate.
+        """
+        self.needsRefresh = False
+        # Get the position of the current player's king, straight from its bitboard.
+        self.kingPosition = SQUARES[self.bitboard.kingSquare(self.bitboard.color)]
+        # Generate all legal moves, the GUI's tuple set is only built if possibleMoves is read.
+        self.legalMoves = self.bitboard.genLegalMoves()
+        self.possibleMoves = None
         self.isCheck()
-        setToDelete = set()
-        for i, t in sorted(toDelete, reverse=True):
-            if i in setToDelete:
-                continue
-            self.possibleMoves.remove(i)
-            setToDelete.add(i)
-        # update the castling
-        self.updateCastlingRights(self.kingPosition)
-        # add check symbol to notation
-        if self.isInCheck:
-            moveObj = self.moveLog[-1]
-            moveObj.checkOrMate = "+"
-            print(f"Move: {moveObj}")
-        if not self.possibleMoves and self.isInCheck:
+        if not self.legalMoves and self.isInCheck:
             # If there are no valid moves and the king is in check, it's checkmate.
-            moveObj.checkOrMate = "#"
-            print(f"Move: {moveObj}")
-            print("Checkmate!", ("Black wins!" if self.isWhiteTurn else "White wins!"))
+            trace(RESULT, "Checkmate! {}", "Black wins!" if self.isWhiteTurn else "White wins!")
             return "GG"
-        elif not self.possibleMoves:
+        elif not self.legalMoves:
             # If there are no valid moves but the king is not in check, it's stalemate.
-            print("Stalemate!")
+            trace(RESULT, "Stalemate!")
             return "SM"
+        elif self.bitboard.repetitions() >= 3:
+            # The same position with the same side to move for the third time.
+            trace(RESULT, "Draw by threefold repetition!")
+            return "TR"
+        elif self.fiftyMoveRule >= 100:
+            # Fifty moves of each side without a capture or a pawn move, checkmate goes first.
+            trace(RESULT, "Draw by the fifty-move rule!")
+            return "FM"
         return ""
 
     def isCheck(self):
         """
         Module that modifies self.isCheck depending on if it's check
         """
-        self.isInCheck = False
-        if self.kingPosition in self.opponentMoves:
-            self.isInCheck = True
+        self.isInCheck = self.bitboard.isSquareAttacked(
+            self.bitboard.kingSquare(self.bitboard.color),
+            1 - self.bitboard.color,
+            self.bitboard.occupied,
+        )
 
-    def genPossibleMoves(self, board: list) -> list:
+    def genPossibleMoves(self) -> set:
         """
-        Generates all possible moves for the current player, without considering checks.
-
-        :Parameters:
-        - board: list
-            The current state of the board.
+        Turns the packed legal moves of the current player into the GUI's tuples. A castle is
+        stored as the king moving onto its rook, the same squares the player clicks.
 
         :Returns:
-        - list: A list of all possible moves for the current player.
+        - set: A set of ((end row, end col), (start row, start col)) moves.
         """
         possibleMoves = set()
-        colors = ["w", "b"]  # Define colors for white and black pieces.
-        turn = 0 if self.isWhiteTurn else 1  # Determine whose turn it is.
-        for row in range(len(board)):
-            for col in range(len(board[0])):
-                piece = board[row][col]
-                if piece[0] == colors[turn]:
-                    # Generate moves based on the piece type.
-                    if piece[1] == "P":
-                        self.pawnMoves(
-                            row,
-                            col,
-                            piece,
-                            board,
-                            possibleMoves,
-                            colors[1 - turn],  # Opponent's color.
-                        )
-                    elif piece[1] == "N":
-                        self.knightMoves(row, col, piece, board, possibleMoves)
-                    elif piece[1] == "R":
-                        self.rookMoves(row, col, piece, board, possibleMoves)
-                    elif piece[1] == "B":
-                        self.bishopMoves(row, col, piece, board, possibleMoves)
-                    elif piece[1] == "Q":
-                        self.queenMoves(row, col, piece, board, possibleMoves)
-                    elif piece[1] == "K":
-                        self.kingMoves(row, col, piece, board, possibleMoves)
+        for move in self.legalMoves:
+            fromSq, toSq, flag = decodeMove(move)
+            if flag == SHORT_CASTLE:
+                toSq = fromSq + 3
+            elif flag == LONG_CASTLE:
+                toSq = fromSq - 4
+            possibleMoves.add((SQUARES[toSq], SQUARES[fromSq]))
         return possibleMoves
 
-    def genOpponentMoves(self, board: list) -> None:
+    def iterLegalMoves(self, stage: int = ALL_MOVES):
+        """
+        Yields the legal moves of the current player as packed integers, captures and promotions
+        first and then the quiet moves, which are only generated if the consumer gets that far.
+        Don't push or pop while iterating.
+
+        :Parameters:
+        - stage: int
+            ALL_MOVES, CAPTURES or QUIETS from bitboard.
+
+        :Yields:
+        - int: Packed moves, see bitboard.encodeMove and Move.fromPacked.
         """
-        Method to get opponent moves
+        return self.bitboard.iterLegalMoves(stage)
+
+    def perft(self, depth: int, table: PerftTable | None = None, workers: int = 1) -> int:
         """
-        self.isWhiteTurn = not self.isWhiteTurn
-        self.opponentMoves = set(move[0] for move in self.genPossibleMoves(self.board))
-        self.isWhiteTurn = not self.isWhiteTurn
+        Counts the leaf nodes of the legal move tree of the current position to the given depth,
+        to check and time the move generation against known counts.
+
+        :Parameters:
+        - depth: int
+            Plies to search.
+        - table: PerftTable
+            Optional, reuses the counts of transposed positions, see BitBoard.perft.
+        - workers: int
+            Processes to split the tree over, see BitBoard.parallelDivide.
+
+        :Returns:
+        - int: The number of leaf nodes.
+        """
+        return self.bitboard.perft(depth, table, workers)
+
+    def divide(
+        self, depth: int, table: PerftTable | None = None, workers: int = 1
+    ) -> dict[str, int]:
+        """
+        Splits perft over the root moves.
+
+        :Parameters:
+        - depth: int
+            Plies to search, the root move included.
+        - table: PerftTable
+            Optional, see perft.
+        - workers: int
+            Processes to split the tree over, see perft.
+
+        :Returns:
+        - dict[str, int]: The leaf nodes under every root move, keyed by its UCI notation.
+        """
+        return {
+            moveToUci(move): nodes
+            for move, nodes in self.bitboard.divide(depth, table, workers).items()
+        }
+
+    @staticmethod
+    def packMove(move: "int | Move") -> int:
+        """
+        Returns the packed integer of a move given either packed or as a Move object.
+        """
+        return move.encode() if isinstance(move, Move) else move
+
+    def givesCheck(self, move: "int | Move") -> bool:
+        """
+        Checks if a legal move of the current player checks the other king, without making it.
+
+        :Parameters:
+        - move: int | Move
+            The move, packed (see bitboard.encodeMove) or as a Move object.
+
+        :Returns:
+        - bool: True if the move gives check, directly or discovered.
+        """
+        return self.bitboard.givesCheck(self.packMove(move))
+
+    def isCapture(self, move: "int | Move") -> bool:
+        """
+        Checks if a move of the current player takes a piece, en passant included.
+        """
+        return self.bitboard.isCapture(self.packMove(move))
+
+    def isPromotion(self, move: "int | Move") -> bool:
+        """
+        Checks if a move of the current player promotes a pawn.
+        """
+        return self.bitboard.isPromotion(self.packMove(move))
+
+    def see(self, move: "int | Move") -> int:
+        """
+        Static exchange evaluation of a move of the current player, see BitBoard.see.
+
+        :Parameters:
+        - move: int | Move
+            The move, packed (see bitboard.encodeMove) or as a Move object.
+
+        :Returns:
+        - int: The material won by the exchange on the target square, a pawn is 100.
+        """
+        return self.bitboard.see(self.packMove(move))
+
+    def seeGE(self, move: "int | Move", threshold: int = 0) -> bool:
+        """
+        Checks if the static exchange evaluation of a move is at least threshold, e.g. to skip
+        the captures that lose material.
+        """
+        return self.bitboard.seeGE(self.packMove(move), threshold)
 
     def makeMove(self, moveObj: "Move") -> None:
         """
-        Executes a move on the board.
+        Executes a move on the board, logs it with its check or mate symbol and generates the
+        valid moves of the next player.
 
         :Parameters:
         - moveObj: Move
             The move object containing the move details.
         """
-        print("----")
-        # Handles making a move on the board.
-
-        # Remove the other piece (if any) from its starting square.
-        self.board[moveObj.otherStartSq[0]][moveObj.otherStartSq[1]] = "__"
-        # Place the other piece (if any) to its ending square.
-        self.board[moveObj.otherEndSq[0]][moveObj.otherEndSq[1]] = moveObj.pieceOther
-        # Remove the moving piece from its starting square.
-        self.board[moveObj.moverStartSq[0]][moveObj.moverStartSq[1]] = "__"
-        if moveObj.type == 3:
-            # Handle promotion move: replace the pawn with the promoted piece.
-            self.board[moveObj.moverEndSq[0]][moveObj.moverEndSq[1]] = (
-                moveObj.pieceMoved[0] + moveObj.promotedTo
-            )
-        else:
-            # Move the piece to its ending square.
-            self.board[moveObj.moverEndSq[0]][moveObj.moverEndSq[1]] = (
-                moveObj.pieceMoved
-            )
+        trace(GAME, "----")
+        # Worked out from the attack tables before the move, turned into "#" if it mates.
+        moveObj.checkOrMate = "+" if self.givesCheck(moveObj) else ""
+        self.push(moveObj)
+        self.moveLog.append(moveObj)
+        # Generate the valid moves
+        self.refresh()
+        if self.gameUpdate == "GG":
+            moveObj.checkOrMate = "#"
+        if self.isInCheck:
+            trace(GAME, "Move: {}", moveObj)
+
+    def push(self, move: "int | Move") -> None:
+        """
+        Executes a move on the board without generating or logging anything, the valid moves and
+        the game status are generated when possibleMoves or gameUpdate is accessed next. Meant
+        for code that walks a tree of moves, the move log and the notation are only kept by
+        makeMove.
+
+        :Parameters:
+        - move: int | Move
+            The move, packed (see bitboard.encodeMove) or as a Move object.
+        """
+        # The bitboards keep the castling rights, the en passant square and the fifty-move counter
+        # in their undo record.
+        self.bitboard.makeMove(self.packMove(move))
+        self.boardView = None
         # Switch turn to the other player.
         self.isWhiteTurn = not self.isWhiteTurn
+        self.needsRefresh = True
 
-        # Log the stuff
-        self.moveLog.append(moveObj)
-        self.enPassantLog.append(self.enPassantPlace)
-        self.enPassantPlace = "-"
+    @property
+    def enPassantPlace(self) -> str:
+        """
+        The square a pawn can capture en passant on in chess notation, "-" if there is none.
+        """
+        if self.bitboard.enPassant == -1:
+            return "-"
+        return Move.getSqaure(SQUARES[self.bitboard.enPassant])
 
-        # fifty-move rule conditions
-        if moveObj.pieceMoved[1] == "P" or moveObj.isPieceCaptured:
-            self.fiftyMoveRule = 0
-        else:
-            self.fiftyMoveRule += 1
-
-        # check if the pawn has been double pawn moved
-        if (
-            abs(moveObj.moverEndSq[0] - moveObj.moverStartSq[0]) == 2
-            and moveObj.pieceMoved[1] == "P"
-        ):
-            self.enPassantPlace = Move.getSqaure(
-                (
-                    moveObj.moverEndSq[0] + (1 if not self.isWhiteTurn else -1),
-                    moveObj.moverEndSq[1],
-                )
-            )
-        self.removeCastleRights(moveObj)
+    @property
+    def hash(self) -> int:
+        """
+        64-bit Zobrist key of the position, updated incrementally by every push and pop.
+        """
+        return self.bitboard.hash
 
-        self.castleRightsLog.append(
-            (
-                copy.deepcopy(self.whiteCastleRights),
-                copy.deepcopy(self.blackCastleRights),
-            )
-        )
-        # Generate the valid moves
-        self.gameUpdate = self.genValidMoves(self.board)
-
-    def removeCastleRights(self, moveObj: "Move"):
-        # removing castling rights logic according to moved piece
-        if moveObj.pieceMoved == "wK":
-            self.whiteCastleRights = [False, False, False, True, False]
-        elif moveObj.pieceMoved == "bK":
-            self.blackCastleRights = [False, False, False, True, False]
-        elif moveObj.moverStartSq == (0, 0) or moveObj.moverEndSq == (0, 0):
-            self.blackCastleRights[0] = False
-            self.blackCastleRights[2] = True
-        elif moveObj.moverStartSq == (0, 7) or moveObj.moverEndSq == (0, 7):
-            self.blackCastleRights[1] = False
-            self.blackCastleRights[4] = True
-        elif moveObj.moverStartSq == (7, 0) or moveObj.moverEndSq == (7, 0):
-            self.whiteCastleRights[0] = False
-            self.whiteCastleRights[2] = True
-        elif moveObj.moverStartSq == (7, 7) or moveObj.moverEndSq == (7, 7):
-            self.whiteCastleRights[1] = False
-            self.whiteCastleRights[4] = True
-
-    def restoreCastleRights(self):
-        # restore the rights by popping the most recent rights in the log
-        self.whiteCastleRights, self.blackCastleRights = self.castleRightsLog.pop()
+    @property
+    def fiftyMoveRule(self) -> int:
+        """
+        Counter for the 50 move rule, moves since the last capture or pawn move.
+        """
+        return self.bitboard.halfMoves
 
     def undoMove(self) -> None:
         """
-        Undoes the last move made on the board.
+        Undoes the last move made with makeMove and generates the valid moves again.
         """
         # Undo the last move made.
         if len(self.moveLog) > 0:
-            # Get the last move from the move log.
             moveObj = self.moveLog.pop()
-            # Remove the piece from its ending square (other piece, e.g., rook in castling).
-            self.board[moveObj.otherEndSq[0]][moveObj.otherEndSq[1]] = "__"
-            # Remove the moving piece from its ending square.
-            self.board[moveObj.moverEndSq[0]][moveObj.moverEndSq[1]] = "__"
-            # Restore the other piece to its starting square.
-            self.board[moveObj.otherStartSq[0]][moveObj.otherStartSq[1]] = (
-                moveObj.pieceOther
-            )
-            # Restore the moving piece to its starting square.
-            self.board[moveObj.moverStartSq[0]][moveObj.moverStartSq[1]] = (
-                moveObj.pieceMoved
-            )
-            # Switch turn back to the previous player.
-            self.isWhiteTurn = not self.isWhiteTurn
-            self.gameUpdate = ""
-            # restore the castle rights from before the move
-            self.restoreCastleRights()
+            self.pop()
             # regenerate possible moves
-            self.genValidMoves(self.board)
-            print("----")
-            print(f"Undo Move: {moveObj}")
-
-    def updateCastlingRights(self, kingPos: tuple):
-        if (
-            self.isInCheck
-            or (self.isWhiteTurn and self.whiteCastleRights[3])
-            or (not self.isWhiteTurn and self.blackCastleRights[3])
-            or (not self.isWhiteTurn and kingPos != (0, 4))
-            or (self.isWhiteTurn and kingPos != (7, 4))
-        ):
-            # print("Threat 0")
-            self.disableCastlingRights()
-            return
-
-        # Generate opponent's moves to check for threats along the castling path.
-        self.isWhiteTurn = not self.isWhiteTurn  # Switch turn to opponent.
-        opponentMoves = self.opponentMoves
-        self.isWhiteTurn = not self.isWhiteTurn  # Switch back.
-        # Check for threats along the castling paths.
-        row = kingPos[0]
-        self.checkCastlingPath(row, opponentMoves)
-        rights = self.whiteCastleRights if self.isWhiteTurn else self.blackCastleRights
-
-        if rights[0]:
-            self.possibleMoves.add(((row, 0), kingPos))
-        if rights[1]:
-            self.possibleMoves.add(((row, 7), kingPos))
-        print("Castle Rights:", self.getCastleString())
-
-    def disableCastlingRights(self):
-        if self.isWhiteTurn:
-            self.whiteCastleRights[0] = False
-            self.whiteCastleRights[1] = False
-        else:
-            self.blackCastleRights[0] = False
-            self.blackCastleRights[1] = False
-
-    def checkCastlingPath(self, row: int, opponentMoves: tuple):
-        # Check if any opponent's move attacks the king's row.
-        for r, c in opponentMoves:
-            if r == row:
-                if 4 <= c < 7:  # Threat on the kingside path.
-                    # print("Threat 1")
-                    self.disableKingsideCastling()
-                elif 0 < c <= 4:  # Threat on the queenside path.
-                    # print("Threat 2")
-                    self.disableQueensideCastling()
-
-        # Check for blocking pieces on castling paths.
-        if any(self.board[row][c] != "__" for c in (1, 2, 3)):
-            # print("Threat 3")
-            self.disableQueensideCastling()
-        else:
-            if not (
-                (self.isWhiteTurn and self.whiteCastleRights[2])
-                or (not self.isWhiteTurn and self.blackCastleRights[2])
-            ):
-                self.enableQueensideCastling()
-
-        if any(self.board[row][c] != "__" for c in (5, 6)):
-            # print("Threat 4")
-            self.disableKingsideCastling()
-        else:
-            if not (
-                (self.isWhiteTurn and self.whiteCastleRights[4])
-                or (not self.isWhiteTurn and self.blackCastleRights[4])
-            ):
-                self.enableKingsideCastling()
-
-        self.isWhiteTurn = not self.isWhiteTurn
-        # Check for blocking pieces on castling paths.
-        if any(self.board[7 - row][c] != "__" for c in (1, 2, 3)):
-            # print("Threat 3")
-            self.disableQueensideCastling()
-        else:
-            if not (
-                (self.isWhiteTurn and self.whiteCastleRights[2])
-                or (not self.isWhiteTurn and self.blackCastleRights[2])
-            ):
-                self.enableQueensideCastling()
-
-        if any(self.board[7 - row][c] != "__" for c in (5, 6)):
-            # print("Threat 4")
-            self.disableKingsideCastling()
-        else:
-            if not (
-                (self.isWhiteTurn and self.whiteCastleRights[4])
-                or (not self.isWhiteTurn and self.blackCastleRights[4])
-            ):
-                self.enableKingsideCastling()
-        self.isWhiteTurn = not self.isWhiteTurn
-
-    def disableKingsideCastling(self):
-        if self.isWhiteTurn:
-            self.whiteCastleRights[1] = False
-        else:
-            self.blackCastleRights[1] = False
-
-    def enableKingsideCastling(self):
-        if self.isWhiteTurn:
-            self.whiteCastleRights[1] = True
-        else:
-            self.blackCastleRights[1] = True
+            self.refresh()
+            trace(GAME, "----\nUndo Move: {}", moveObj)
 
-    def disableQueensideCastling(self):
-        if self.isWhiteTurn:
-            self.whiteCastleRights[0] = False
-        else:
-            self.blackCastleRights[0] = False
+    def pop(self) -> int:
+        """
+        Undoes the last move made on the board without generating anything, see push.
 
-    def enableQueensideCastling(self):
-        if self.isWhiteTurn:
-            self.whiteCastleRights[0] = True
-        else:
-            self.blackCastleRights[0] = True
+        :Returns:
+        - int: The move that was undone, packed.
+        """
+        move = self.bitboard.history[-1][0]
+        self.bitboard.undoMove()
+        self.boardView = None
+        # Switch turn back to the previous player.
+        self.isWhiteTurn = not self.isWhiteTurn
+        self.needsRefresh = True
+        return move
 
     def castle(self, kingPos: tuple, rookPos: tuple) -> None:
         """
@@ -433,386 +464,12 @@ class GameState:
         :Returns:
         - bool: True if the move is an en passant, False otherwise.
         """
-        # Handle en passant move if applicable.
-        if len(self.moveLog) >= 1:
-            # Get the last move made.
-            moveObj = self.moveLog[-1]
-            # Check if the last move was a pawn moving two squares forward.
-            if (
-                moveObj.pieceMoved[1] == "P"  # Last moved piece was a pawn.
-                and abs(moveObj.moverStartSq[0] - moveObj.moverEndSq[0])
-                == 2  # Moved two squares.
-                and move[1][1] == moveObj.moverEndSq[1]  # Same column as the pawn.
-                and move[0][0]
-                == moveObj.moverEndSq[0]  # Capturing pawn is next to the moved pawn.
-                and (
-                    (
-                        self.isWhiteTurn and move[1][0] - moveObj.moverEndSq[0] == -1
-                    )  # White pawn moving up.
-                    or (
-                        not self.isWhiteTurn
-                        and move[1][0] - moveObj.moverEndSq[0]
-                        == 1  # Black pawn moving down.
-                    )
-                )
-            ):
-                return True  # En passant is possible.
-        return False  # Not an en passant move.
-
-    def pawnPromotion(self, move: list, screen: p.Surface, promoteTo: str = "") -> str:
-        """
-        Handles pawn promotion when a pawn reaches the opposite end of the board.
-
-        :Parameters:
-        - move: list
-            The move being made, represented as a list of positions.
-        - screen:
-            The game screen to display the promotion options.
-
-        :Returns:
-        - str: The piece to promote to ('R', 'B', 'N', or 'Q').
-        """
-        running = True
-        p_names = [
-            "wR",
-            "wB",
-            "wN",
-            "wQ",
-            "bR",
-            "bB",
-            "bN",
-            "bQ",
-        ]  # Possible promotion pieces.
-        IMAGES = {}
-        font = p.font.SysFont("Arial", 15)  # Set the font for text display.
-        # Load images for promotion options.
-        for e in p_names:
-            IMAGES[e] = p.transform.scale(p.image.load("img/" + e + ".png"), (75, 75))
-        if self.isWhiteTurn:
-            # If it's white's turn, set up the promotion options for white.
-            shift = 75 * (move[0][1] - 4) if move[0][1] > 4 else 0
-            # Draw the promotion selection rectangle.
-            p.draw.rect(
-                screen,
-                (255, 204, 117),  # Background color.
-                (move[0][1] * 75 - shift, (move[0][0]) * 75 + 100, 4 * 75, 90),
-                border_radius=5,
-            )
-            p.draw.rect(
-                screen,
-                (0, 0, 0),  # Border color.
-                (move[0][1] * 75 - shift, (move[0][0]) * 75 + 100, 300, 90),
-                2,
-                5,
-            )
-            for i in range(4):
-                # Display each promotion option.
-                screen.blit(
-                    IMAGES[p_names[i]],  # The image of the piece.
-                    p.Rect(
-                        i * 75 + move[0][1] * 75 - 5 - shift,
-                        (move[0][0]) * 75 + 100,
-                        75,
-                        75,
-                    ),
-                )
-                f = font.render(
-                    str(i + 1), True, (0, 0, 0)
-                )  # Render the option number.
-                screen.blit(
-                    f,
-                    p.Rect(
-                        i * 75 + move[0][1] * 75 + 30 - shift,
-                        (move[0][0]) * 75 + 170,
-                        75,
-                        75,
-                    ),
-                )
-        else:
-            # If it's black's turn, set up the promotion options for black.
-            shift = 75 * (move[0][1] - 4) if move[0][1] > 4 else 0
-            # Draw the promotion selection rectangle.
-            p.draw.rect(
-                screen,
-                (255, 204, 117),  # Background color.
-                (move[0][1] * 75 - shift, (move[0][0]) * 75 - 100, 4 * 75, 90),
-                border_radius=5,
-            )
-            p.draw.rect(
-                screen,
-                (0, 0, 0),  # Border color.
-                (move[0][1] * 75 - shift, (move[0][0]) * 75 - 100, 300, 90),
-                2,
-                5,
-            )
-            for i in range(4, len(p_names)):
-                # Display each promotion option.
-                screen.blit(
-                    IMAGES[p_names[i]],  # The image of the piece.
-                    p.Rect(
-                        i * 75 + move[0][1] * 75 - 303 - shift,
-                        (move[0][0]) * 75 - 100,
-                        75,
-                        75,
-                    ),
-                )
-                f = font.render(
-                    str(i - 3), True, (0, 0, 0)
-                )  # Render the option number.
-                screen.blit(
-                    f,
-                    p.Rect(
-                        i * 75 + move[0][1] * 75 - 268.5 - shift,
-                        (move[0][0]) * 75 - 28,
-                        75,
-                        75,
-                    ),
-                )
-        p.display.flip()  # Update the display.
-        while running:
-            for e in p.event.get():
-                if e.type == p.QUIT:
-                    running = False
-                    exit("QUIT")  # Exit the game.
-                elif e.type == p.KEYDOWN or e.type == p.KEYUP:
-                    # Handle user input for promotion selection.
-                    if e.key == p.K_1:
-                        running = False
-                        return "R"  # Promote to Rook.
-                    elif e.key == p.K_2:
-                        running = False
-                        return "B"  # Promote to Bishop.
-                    elif e.key == p.K_3:
-                        running = False
-                        return "N"  # Promote to Knight.
-                    elif e.key == p.K_4:
-                        running = False
-                        return "Q"  # Promote to Queen.
-        return
-
-    def pawnMoves(
-        self,
-        row: int,
-        col: int,
-        piece: str,
-        board: list,
-        possibleMoves: set,
-        oColor: str,
-    ) -> None:
-        """
-        Generates all possible pawn moves from the given position.
-
-        :Parameters:
-        - row: int
-            The row index of the pawn.
-        - col: int
-            The column index of the pawn.
-        - piece: str
-            The piece representation (e.g., 'wP' for white pawn).
-        - board: list
-            The current state of the board.
-        - possibleMoves: list
-            The list to append possible moves to.
-        - oColor: str
-            The opponent's color ('w' for white, 'b' for black).
-        """
-        # Handle en passant conditions.
-        if len(self.moveLog) >= 1:
-            moveObj = self.moveLog[-1]  # Get the last move made.
-            if (
-                moveObj.pieceMoved[1] == "P"  # Last moved piece was a pawn.
-                and abs(moveObj.moverEndSq[0] - moveObj.moverStartSq[0])
-                == 2  # Moved two squares.
-                and row
-                == moveObj.moverEndSq[0]  # Pawn is on the same rank as the moved pawn.
-            ):
-                if col + 1 == moveObj.moverEndSq[1]:
-                    # Check for en passant capture to the right.
-                    if oColor == "b":
-                        possibleMoves.add(((row - 1, col + 1), (row, col)))
-                    else:
-                        possibleMoves.add(((row + 1, col + 1), (row, col)))
-                if col - 1 == moveObj.moverEndSq[1]:
-                    # Check for en passant capture to the left.
-                    if oColor == "b":
-                        possibleMoves.add(((row - 1, col - 1), (row, col)))
-                    else:
-                        possibleMoves.add(((row + 1, col - 1), (row, col)))
-        if piece[0] == "w":
-            # White pawn moves.
-            if row == 6 and board[row - 1][col] == "__" and board[row - 2][col] == "__":
-                # Pawn's first move can be two squares forward if both squares are empty.
-                possibleMoves.add(((row - 2, col), (row, col)))
-            if board[row - 1][col] == "__":
-                # Move one square forward if the square is empty.
-                possibleMoves.add(((row - 1, col), (row, col)))
-            if col - 1 >= 0 and board[row - 1][col - 1][0] == "b":
-                # Capture diagonally to the left if there is a black piece.
-                possibleMoves.add(((row - 1, col - 1), (row, col)))
-            if col + 1 < 8 and board[row - 1][col + 1][0] == "b":
-                # Capture diagonally to the right if there is a black piece.
-                possibleMoves.add(((row - 1, col + 1), (row, col)))
-        elif piece[0] == "b":
-            # Black pawn moves.
-            if row == 1 and board[row + 1][col] == "__" and board[row + 2][col] == "__":
-                # Pawn's first move can be two squares forward if both squares are empty.
-                possibleMoves.add(((row + 2, col), (row, col)))
-            if board[row + 1][col] == "__":
-                # Move one square forward if the square is empty.
-                possibleMoves.add(((row + 1, col), (row, col)))
-            if col - 1 >= 0 and board[row + 1][col - 1][0] == "w":
-                # Capture diagonally to the left if there is a white piece.
-                possibleMoves.add(((row + 1, col - 1), (row, col)))
-            if col + 1 < 8 and board[row + 1][col + 1][0] == "w":
-                # Capture diagonally to the right if there is a white piece.
-                possibleMoves.add(((row + 1, col + 1), (row, col)))
-
-    def knightMoves(
-        self,
-        row: int,
-        col: int,
-        piece: str,
-        board: list,
-        possibleMoves: set,
-    ) -> None:
-        """
-        Generates all possible knight moves from the given position.
-
-        :Parameters:
-        - row: int
-            The row index of the knight.
-        - col: int
-            The column index of the knight.
-        - piece: str
-            The piece representation (e.g., 'wN' for white knight).
-        - board: list
-            The current state of the board.
-        - possibleMoves: list
-            The list to append possible moves to.
-        """
-        # List of possible moves a knight can make.
-        knight_moves = [
-            (2, -1),
-            (2, 1),  # Moves two squares down, one square left/right.
-            (-2, -1),
-            (-2, 1),  # Moves two squares up, one square left/right.
-            (1, 2),
-            (-1, 2),  # Moves one square up/down, two squares right.
-            (1, -2),
-            (-1, -2),  # Moves one square up/down, two squares left.
-        ]
-        for move in knight_moves:
-            r = row + move[0]
-            c = col + move[1]
-            if 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c][0] != piece[0]:
-                    # Add the move if the destination is empty or contains an opponent's piece.
-                    possibleMoves.add(((r, c), (row, col)))
-
-    def rookMoves(
-        self, row: int, col: int, piece: str, board: list, possibleMoves: set
-    ) -> None:
-        """
-        Generate all possible rook moves from the given position.
-        """
-        # Directions in which a rook can move: up, down, left, right.
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        for d in directions:
-            for i in range(1, 8):
-                r = row + d[0] * i
-                c = col + d[1] * i
-                if 0 <= r < 8 and 0 <= c < 8:
-                    if board[r][c] == "__":
-                        possibleMoves.add(((r, c), (row, col)))
-                    elif board[r][c][0] != piece[0]:
-                        possibleMoves.add(((r, c), (row, col)))
-                        break
-                    else:
-                        break
-                else:
-                    break
-
-    def bishopMoves(
-        self, row: int, col: int, piece: str, board: list, possibleMoves: set
-    ) -> None:
-        """
-        Generate all possible bishop moves from the given position.
-        """
-        # Directions in which a bishop can move: diagonals.
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for d in directions:
-            for i in range(1, 8):
-                r = row + d[0] * i
-                c = col + d[1] * i
-                if 0 <= r < 8 and 0 <= c < 8:
-                    if board[r][c] == "__":
-                        possibleMoves.add(((r, c), (row, col)))
-                    elif board[r][c][0] != piece[0]:
-                        possibleMoves.add(((r, c), (row, col)))
-                        break
-                    else:
-                        break
-                else:
-                    break
-
-    def queenMoves(
-        self, row: int, col: int, piece: str, board: list, possibleMoves: set
-    ) -> None:
-        """
-        Generates all possible queen moves from the given position.
-
-        :Parameters:
-        - row: int
-            The row index of the queen.
-        - col: int
-            The column index of the queen.
-        - piece: str
-            The piece representation (e.g., 'wQ' for white queen).
-        - board: list
-            The current state of the board.
-        - possibleMoves: list
-            The list to append possible moves to.
-        """
-        # The queen's moves are a combination of rook and bishop moves.
-        self.bishopMoves(row, col, piece, board, possibleMoves)
-        self.rookMoves(row, col, piece, board, possibleMoves)
-
-    def kingMoves(
-        self, row: int, col: int, piece: str, board: list, possibleMoves: set
-    ) -> None:
-        """
-        Generates all possible king moves (one square in any direction) from the given position.
-
-        :Parameters:
-        - row: int
-            The row index of the king.
-        - col: int
-            The column index of the king.
-        - piece: str
-            The piece representation (e.g., 'wK' for white king).
-        - board: list
-            The current state of the board.
-        - possibleMoves: list
-            The list to append possible moves to.
-        """
-        # Directions the king can move: one square in any direction.
-        directions = [
-            (-1, 0),  # Up
-            (1, 0),  # Down
-            (0, -1),  # Left
-            (0, 1),  # Right
-            (-1, 1),  # Up-Right
-            (1, 1),  # Down-Right
-            (-1, -1),  # Up-Left
-            (1, -1),  # Down-Left
-        ]
-        for d in directions:
-            r = row + d[0]
-            c = col + d[1]
-            if 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c][0] != piece[0]:
-                    # Add the move if the destination is empty or contains an opponent's piece.
-                    possibleMoves.add(((r, c), (row, col)))
+        # The bitboards keep the en passant square, also for a game started from a snapshot.
+        if self.bitboard.enPassant == -1 or squareIndex(move[1]) != self.bitboard.enPassant:
+            return False
+        piece = self.bitboard.squares[squareIndex(move[0])]
+        # Only a pawn of the side to move can take en passant.
+        return piece & 7 == PAWN and piece >> 3 == self.bitboard.color
 
     def posOfPiece(self, piece: str) -> list:
         """
@@ -825,263 +482,8 @@ class GameState:
         :Returns:
         - list: A list of positions where the piece is located.
         """
-        # Initialize a list to store positions.
-        pos = []
-        for row in range(len(self.board)):
-            for col in range(len(self.board[0])):
-                if self.board[row][col] == piece:
-                    pos.append((row, col))  # Add the position to the list.
-        return pos
-
-    def checkAroundKing(self, king: tuple) -> bool:
-        """
-        Checks for checks and pins around the king.
-
-        :Parameters:
-        - king: tuple
-            The position of the king (row, col).
-
-        :Returns:
-        - bool: True if the king is in check, False otherwise.
-        """
-        # Determine the current color and opponent's color.
-        currColor = self.board[king[0]][king[1]][0]
-        oColor = "w" if currColor == "b" else "b"
-        # Possible directions to check around the king.
-        kMoves = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (1, 1), (-1, -1), (1, -1))
-        locOwnColor = False  # Flag to indicate if we've encountered our own piece.
-        toDelete = set()  # (index, type) # type 0 = pin, 1 = check, 2 = illegal move
-        # Check for knight checks and remove illegal king moves.
-        self.checkKnightcheck(oColor, self.kingPosition, toDelete)
-        self.kingCantMoveWhere(toDelete)
-
-        for move in kMoves:  # Check all directions around the king.
-            for i in range(1, 8):
-                r_off = move[0] * i
-                c_off = move[1] * i
-                r = r_off + king[0]
-                c = c_off + king[1]
-
-                if 0 <= r < 8 and 0 <= c < 8:
-                    # Get the piece at the current position.
-                    piece = self.board[r][c]
-                    pColor = piece[0]  # Piece color: 'w' or 'b'.
-                    pType = piece[1]  # Piece type: 'Q', 'R', 'B', 'N', 'P', or 'K'.
-                    if pType == "_":
-                        continue
-                    if pColor == currColor:
-                        # If we've already encountered our own piece, stop checking this direction.
-                        if locOwnColor:
-                            break
-                        locOwnColor = (r, c)  # Mark the position of our own piece.
-                    else:
-                        if locOwnColor:
-                            # An opponent's piece is behind our own piece, which might be pinned.
-                            print(
-                                f"Possible Pin - Pinner: {Move.getSqaure((r,c))} - Dir: {move} - Pinner: {piece}"
-                            )
-                            self.pinned((r, c), locOwnColor, move, piece[1], toDelete)
-                            locOwnColor = False
-                            break
-                        # Check for checks from opponent pieces.
-                        elif (c_off == 0 or r_off == 0) and (pType in "RQ"):
-                            # Straight line checks (rook or queen).
-                            print(
-                                f"Rem Move - Square: {Move.getSqaure((r,c))} - Dir: {move} - Piece: {piece[1]}"
-                            )
-                            self.remMoves(r, c, True, toDelete, king)
-                        elif (c_off != 0 and r_off != 0) and (pType in "BQ"):
-                            # Diagonal checks (bishop or queen).
-                            print(
-                                f"Rem Move - Square: {Move.getSqaure((r, c))} - Dir: {move} - Piece: {piece[1]}"
-                            )
-                            self.remMoves(r, c, False, toDelete, king)
-                        elif (
-                            (currColor == "w" and r_off == -1 and abs(c_off) == 1)
-                            or (currColor == "b" and r_off == 1 and abs(c_off) == 1)
-                        ) and (pType == "P"):
-                            # Check for pawn checks.
-                            print(
-                                f"Rem Move - Square: {Move.getSqaure((r, c))} - Dir: {move} - Piece: {piece[1]}"
-                            )
-                            self.remMoves(r, c, False, toDelete, king)
-                        else:
-                            break
-                else:
-                    break
-            locOwnColor = False  # Reset the flag for the next direction.
-        return toDelete
-
-    def remMoves(self, r: int, c: int, vh: bool, toDelete: set, kingPos: tuple) -> None:
-        """
-        Removes illegal moves due to checks, ensuring the king is not left in check.
-
-        :Parameters:
-        - r: int
-            The row index of the checking piece.
-        - c: int
-            The column index of the checking piece.
-        - vh: bool
-            True if the threat is vertical/horizontal, False if diagonal.
-        """
-        if vh:  # If the threat is vertical or horizontal.
-            d_row = kingPos[0] - r
-            d_col = kingPos[1] - c
-            if d_row == 0:
-                # Threat is horizontal.
-                for m in self.possibleMoves:
-                    if m[1] == kingPos and (
-                        (d_col > 0 and (m[0][0] == r and kingPos[1] > m[0][1] > c))
-                        or (d_col < 0 and (m[0][0] == r and kingPos[1] < m[0][1] < c))
-                    ):
-                        # Remove moves that don't block or capture the checking piece.
-                        toDelete.add((m, 1))
-                    elif m[1] != kingPos and (
-                        (d_col > 0 and not (m[0][0] == r and kingPos[1] > m[0][1] >= c))
-                        or (
-                            d_col < 0
-                            and not (m[0][0] == r and kingPos[1] < m[0][1] <= c)
-                        )
-                    ):
-                        toDelete.add((m, 1))
-            if d_col == 0:
-                # Threat is vertical.
-                for m in self.possibleMoves:
-                    if m[1] == kingPos and (
-                        (d_row > 0 and (m[0][1] == c and kingPos[0] > m[0][0] > r))
-                        or (d_row < 0 and (m[0][1] == c and kingPos[0] < m[0][0] < r))
-                    ):
-                        toDelete.add((m, 1))
-                    elif m[1] != kingPos and (
-                        (d_row > 0 and not (m[0][1] == c and kingPos[0] > m[0][0] >= r))
-                        or (
-                            d_row < 0
-                            and not (m[0][1] == c and kingPos[0] < m[0][0] <= r)
-                        )
-                    ):
-                        toDelete.add((m, 1))
-        else:
-            # Diagonal threat.
-            d_row = kingPos[0] - r
-            d_col = kingPos[1] - c
-            d_row = d_row / abs(d_row)
-            d_col = d_col / abs(d_col)
-            # Build list of positions between the checking piece and the king.
-            places = [(r, c), (r + d_row, c + d_col)]
-            counter = 2
-            while places[-1] != kingPos:
-                places.append((r + d_row * counter, c + d_col * counter))
-                counter += 1
-            for m in self.possibleMoves:
-                if m[1] == self.kingPosition:
-                    if m[0] == (r, c):
-                        continue  # Allow capturing the checking piece.
-                    elif m[0] in places:
-                        toDelete.add((m, 1))
-                elif m[0] not in places:
-                    toDelete.add((m, 1))
-
-    def kingCantMoveWhere(self, toDelete: set) -> None:
-        """
-        Determines squares where the king cannot move due to threats.
-        """
-        # Create a copy of the board to test moves.
-        kMoves = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, 1), (1, 1), (-1, -1), (1, -1))
-        y, x = self.kingPosition
-        b = [row[:] for row in self.board]
-        for move in kMoves:
-            y1 = y + move[0]
-            x1 = x + move[1]
-            move = ((y1, x1), (y, x))
-            if 0 <= y1 < 8 and 0 <= x1 < 8 and move in self.possibleMoves:
-                b[y1][x1], b[y][x] = b[y][x], "__"
-                self.isWhiteTurn = not self.isWhiteTurn
-                opponentMoves = self.genPossibleMoves(b)
-                opponentMovesCopy = set()
-                for oppMove in opponentMoves:
-                    opponentMovesCopy.add(oppMove[0])
-                self.isWhiteTurn = not self.isWhiteTurn
-                if (y1, x1) in opponentMovesCopy:
-                    toDelete.add((move, 3))
-
-    def pinned(
-        self, pinner: tuple, pinned: tuple, moveDir: tuple, piece: str, toDelete: set
-    ) -> None:
-        """
-        Handles pinning of pieces. Removes moves that would expose the king to check if the piece is pinned.`
-
-        :Parameters:
-        - pinner: tuple
-            The position of the opponent's piece causing the pin (row, col).
-        - pinned: tuple
-            The position of the pinned piece (row, col).
-        - moveDir: tuple
-            The direction of the pinning move (row_offset, col_offset).
-        - piece: str
-            The type of the opponent's piece causing the pin (e.g., 'Q' for queen).
-        """
-        m_r = moveDir[0]
-        m_c = moveDir[1]
-        if m_r == 0 or m_c == 0:
-            if m_c == 0 and (piece == "R" or piece == "Q"):
-                print("Pin: R or Q")
-                for move in self.possibleMoves:
-                    movePiece = move[1]
-                    if movePiece == pinned:
-                        movePlace = move[0]
-                        if movePiece[1] - movePlace[1] != 0:
-                            # Remove moves that move the pinned piece off the pinning line.
-                            toDelete.add((move, 0))
-            elif m_r == 0 and (piece == "B" or piece == "Q"):
-                print("Pin: B or Q")
-                for move in self.possibleMoves:
-                    movePiece = move[1]
-                    if movePiece == pinned:
-                        movePlace = move[0]
-                        if movePiece[0] - movePlace[0] != 0 and movePlace != pinned:
-                            toDelete.add((move, 0))
-        elif piece == "Q" or piece == "B":
-            print("Pin: B or Q outside elif")
-            for move in self.possibleMoves:
-                movePiece = move[1]
-                if movePiece == pinned:
-                    movePlace = move[0]
-                    # Calculate the direction of the move.
-                    pieceDir = (
-                        (movePiece[0] - movePlace[0])
-                        / (abs(movePiece[0] - movePlace[0]) or 1),
-                        (movePiece[1] - movePlace[1])
-                        / (abs(movePiece[1] - movePlace[1]) or 1),
-                    )
-                    if pieceDir != moveDir and movePlace != pinner:
-                        # Remove moves that move the pinned piece off the pinning line.
-                        toDelete.add((move, 0))
-
-    def checkKnightcheck(self, oColor: str, kingPos: tuple, toDelete: set) -> None:
-        """
-        Checks if the king is under attack by a knight and removes illegal moves accordingly.
-
-        :Parameters:
-        - oColor: str
-            The opponent's color ('w' or 'b').
-        - kingPos: tuple
-            The position of the king (row, col).
-        """
-        posKnightPlaces = set()
-        # Generate possible knight moves from the king's position.
-        self.knightMoves(kingPos[0], kingPos[1], kingPos, self.board, posKnightPlaces)
-        posKnightPlaces = [x[0] for x in posKnightPlaces]
-        KnIsPresent = None
-        # Check if any of these positions contain an opponent's knight.
-        for r, c in posKnightPlaces:
-            if self.board[r][c] == oColor + "N":
-                KnIsPresent = (r, c)
-                break
-        if KnIsPresent:
-            # Remove moves that do not capture the knight or move the king.
-            for p in self.possibleMoves:
-                if p[0] != KnIsPresent and self.board[p[1][0]][p[1][1]][1] != "K":
-                    toDelete.add((p, 0))
+        # The bitboard of the piece only has bits on the squares it stands on.
+        return [SQUARES[sq] for sq in self.bitboard.pieceSquares(PIECE_CODES[piece])]
 
     def pawnChecks(self, userClicks: list) -> bool:
         """
@@ -1094,7 +496,8 @@ class GameState:
         :Returns:
         - bool: True if pawn promotion is possible, False otherwise.
         """
-        return self.board[userClicks[0][0]][userClicks[0][1]][1] == "P" and (
+        piece = self.bitboard.squares[squareIndex(userClicks[0])]
+        return piece & 7 == PAWN and (
             (userClicks[1][0] == 0) or (userClicks[1][0] == 7)
         )
 
@@ -1109,11 +512,13 @@ class GameState:
         :Returns:
         - bool: True if castling is possible, False otherwise.
         """
+        king = self.bitboard.squares[squareIndex(userClicks[0])]
+        rook = self.bitboard.squares[squareIndex(userClicks[1])]
         return (
-            self.board[userClicks[0][0]][userClicks[0][1]][1] == "K"
-            and self.board[userClicks[1][0]][userClicks[1][1]][1] == "R"
-            and self.board[userClicks[0][0]][userClicks[0][1]][0]
-            == self.board[userClicks[1][0]][userClicks[1][1]][0]
+            king & 7 == KING
+            and rook & 7 == ROOK
+            # Same colour, the colour bit is the only other bit of a piece code.
+            and king >> 3 == rook >> 3
             and tuple(userClicks[::-1]) in self.possibleMoves
         )
 
@@ -1125,11 +530,12 @@ class GameState:
         - userClicks: list
             The list of user clicks (current move).
         """
-        moveObj = self.moveLog[-1]
+        # The captured pawn stands next to the capturing one, on the file it moves to.
+        capturedSq = (userClicks[0][0], userClicks[1][1])
         # Create the en passant move.
         moveObj = Move(
             userClicks,  # Piece moved.
-            (moveObj.moverEndSq, userClicks[1]),  # Piece captured.
+            (capturedSq, userClicks[1]),  # Piece captured.
             self.board,
             2,  # Type of move (en passant).
         )
@@ -1138,9 +544,7 @@ class GameState:
     def getCastleString(self):
         # method to get the castling sides in string
         # FEN format
-        white = f"{"K" if self.whiteCastleRights[1] else ""}{"Q" if self.whiteCastleRights[0] else ""}"
-        black = f"{"k" if self.blackCastleRights[1] else ""}{"q" if self.blackCastleRights[0] else ""}"
-        return "-" if not white and not black else white + black
+        return self.bitboard.castleString()
 
     def numOfMoves(self):
         # return the number of moves
@@ -1165,12 +569,15 @@ class GameState:
             ]
 
     def pieceColor(self, y, x):
-        return self.board[y][x][0]
+        piece = self.bitboard.squares[y * 8 + x]
+        return "_" if piece == EMPTY else "wb"[piece >> 3]
 
 
 class Move:
     """
     Represents a chess move with support for special moves such as castling, en passant, and pawn promotion.
+    The engine itself works on packed integer moves, a Move is built from one with fromPacked for
+    the GUI and the notation log and turned back into one with encode.
 
     :Attributes:
     - moverStartSq (tuple): Starting square of the primary moving piece (row, col).
@@ -1189,6 +596,23 @@ class Move:
     ROWS_TO_RANKS = {v: k for k, v in RANKS_TO_ROWS.items()}
     FILES_TO_COLS = {chr(i): i - ord("a") for i in range(ord("a"), ord("h") + 1)}
     COLS_TO_FILES = {v: k for k, v in FILES_TO_COLS.items()}
+    # Move.type of every packed move flag and back, promotions all map to 3.
+    FLAG_TO_TYPE = {NORMAL: 0, SHORT_CASTLE: 1, LONG_CASTLE: -1, EN_PASSANT: 2}
+    TYPE_TO_FLAG = {v: k for k, v in FLAG_TO_TYPE.items()}
+    PROMOTION_PIECES = "NBRQ"
+
+    __slots__ = (
+        "moverStartSq",
+        "moverEndSq",
+        "otherStartSq",
+        "otherEndSq",
+        "pieceMoved",
+        "pieceOther",
+        "isPieceCaptured",
+        "promotedTo",
+        "type",
+        "checkOrMate",
+    )
 
     def __init__(
         self,
@@ -1238,6 +662,57 @@ class Move:
         self.type: int = typeOfMove
         self.checkOrMate = ""
 
+    @classmethod
+    def fromPacked(cls, move: int, board: list) -> "Move":
+        """
+        Builds a Move from a packed integer move, see bitboard.encodeMove.
+
+        :Parameters:
+        - move: int
+            The packed move.
+        - board: list
+            2D list representing the chess board before the move.
+
+        :Returns:
+        - Move: The move with its squares and pieces filled in.
+        """
+        fromSq, toSq, flag = decodeMove(move)
+        start = SQUARES[fromSq]
+        end = SQUARES[toSq]
+        if flag == SHORT_CASTLE:
+            # The rook jumps from the h file over the king.
+            return cls((start, end), ((start[0], 7), (start[0], 5)), board, 1)
+        if flag == LONG_CASTLE:
+            # The rook jumps from the a file over the king.
+            return cls((start, end), ((start[0], 0), (start[0], 3)), board, -1)
+        if flag == EN_PASSANT:
+            # The captured pawn sits next to the capturing one, not on the end square.
+            return cls((start, end), ((start[0], end[1]), end), board, 2)
+        if flag >= PROMOTION:
+            return cls(
+                (start, end),
+                (end, end),
+                board,
+                3,
+                cls.PROMOTION_PIECES[flag - PROMOTION],
+            )
+        return cls((start, end), (end, end), board)
+
+    def encode(self) -> int:
+        """
+        Packs the move into the integer the bitboards work with, see bitboard.encodeMove.
+
+        :Returns:
+        - int: The packed move.
+        """
+        if self.type == 3:
+            flag = PROMOTION + self.PROMOTION_PIECES.index(self.promotedTo)
+        else:
+            flag = self.TYPE_TO_FLAG[self.type]
+        return encodeMove(
+            squareIndex(self.moverStartSq), squareIndex(self.moverEndSq), flag
+        )
+
     def __str__(self) -> str:
         """
         Convert the move to a human-readable chess notation.
@@ -1329,6 +804,34 @@ class FEN:
             pgn += "/"
         return pgn[:-1]
 
+    @staticmethod
+    def FENtoPosition(fen: str) -> Position:
+        """
+        Reads a full FEN string, e.g. "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1".
+        The fields after the board are optional, white to move without castling rights or en
+        passant square if they are missing.
+
+        :Parameters:
+        - fen: str
+            The FEN string.
+
+        :Returns:
+        - Position: The snapshot of the position, see GameState.fromPosition.
+        """
+        fields = fen.split()
+        board = FEN.FENtoBoard(fields[0])
+        isWhiteTurn = len(fields) < 2 or fields[1] == "w"
+        castling = 0
+        if len(fields) > 2:
+            for right, letter in CASTLING_LETTERS:
+                if letter in fields[2]:
+                    castling |= right
+        enPassant = -1
+        if len(fields) > 3 and fields[3] != "-":
+            enPassant = SQUARE_NAMES.index(fields[3])
+        halfMoves = int(fields[4]) if len(fields) > 4 else 0
+        return BitBoard(board, isWhiteTurn, enPassant, halfMoves, castling).snapshot()
+
     @staticmethod
     def FENtoBoard(pgn: str):
         board = [["__"] * 8 for _ in range(8)]
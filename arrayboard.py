@@ -0,0 +1,554 @@
+"""
+arrayboard.py holds an optional NumPy view of the board: an int8 array of the piece codes of
+bitboard.PIECE_NAMES, shaped (8, 8) with row 0 = rank 8 like GameState.board. The routines below
+work on whole arrays at once. The evaluation ones take a single board or a stack of boards shaped
+(N, 8, 8), the batch ones a stack, and moves only ever come out as arrays of packed moves.
+
+NumPy is not needed by the rest of the engine, importing this module without it raises an
+ImportError that says so.
+"""
+
+from bitboard import (
+    WHITE,
+    BLACK,
+    EMPTY,
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    PIECE_CODES,
+    PIECE_VALUES,
+    NORMAL,
+    PROMOTION_FLAGS,
+    CASTLES,
+    ZOBRIST_PIECES,
+    ZOBRIST_BLACK,
+    ZOBRIST_CASTLING,
+    ZOBRIST_EN_PASSANT,
+    BitBoard,
+    Position,
+)
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError(
+        "arrayboard needs NumPy, install it with 'pip install numpy'"
+    ) from error
+
+# (row, col) steps of every piece, row 0 is rank 8.
+KNIGHT_STEPS: tuple = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_STEPS: tuple = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+BISHOP_STEPS: tuple = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_STEPS: tuple = ((-1, 0), (1, 0), (0, -1), (0, 1))
+# Pawns move up the board for white and down for black, two steps from their start row.
+PAWN_DIRECTIONS: tuple = (-1, 1)
+START_ROWS: np.ndarray = np.zeros((2, 8, 8), dtype=bool)
+START_ROWS[WHITE, 6] = True
+START_ROWS[BLACK, 1] = True
+
+# Material value of every piece code, the kings don't count.
+MATERIAL_VALUES: np.ndarray = np.array(
+    [0 if code & 7 in (EMPTY, KING, 7) else PIECE_VALUES[code & 7] for code in range(16)],
+    dtype=np.int32,
+)
+
+
+def boardToArray(board: list) -> np.ndarray:
+    """
+    Converts a GameState style board, e.g. GameState.board or FEN.FENtoBoard, to an array.
+
+    :Parameters:
+    - board: list
+        2D list of piece names, '__' for an empty square.
+
+    :Returns:
+    - np.ndarray: int8 array of piece codes shaped (8, 8).
+    """
+    return np.array(
+        [[PIECE_CODES[piece] for piece in row] for row in board], dtype=np.int8
+    )
+
+
+def bitboardToArray(bitboard: BitBoard) -> np.ndarray:
+    """
+    Converts the mailbox of a BitBoard to an array, without going through strings.
+    """
+    return np.array(bitboard.squares, dtype=np.int8).reshape(8, 8)
+
+
+def shift(plane: np.ndarray, dr: int, dc: int) -> np.ndarray:
+    """
+    Moves every value of a plane dr rows and dc columns, what falls off the board is lost and
+    the squares left behind are 0.
+
+    :Parameters:
+    - plane: np.ndarray
+        Array shaped (..., 8, 8).
+    - dr: int
+        Rows to move by, negative is up the board.
+    - dc: int
+        Columns to move by, negative is left.
+
+    :Returns:
+    - np.ndarray: The moved plane, same shape and dtype.
+    """
+    if plane.itemsize == 1 and np.little_endian:
+        # A row of one byte values is one uint64 word with column 0 in the lowest byte, so the
+        # rows move as whole words and the columns as a bit shift that drops what falls off.
+        words = np.ascontiguousarray(plane).view(np.uint64)
+        moved = np.zeros_like(words)
+        moved[..., max(dr, 0) : 8 + min(dr, 0), :] = words[..., max(-dr, 0) : 8 + min(-dr, 0), :]
+        if dc > 0:
+            moved <<= np.uint64(8 * dc)
+        elif dc < 0:
+            moved >>= np.uint64(-8 * dc)
+        return moved.view(plane.dtype)
+    moved = np.zeros_like(plane)
+    moved[..., max(dr, 0) : 8 + min(dr, 0), max(dc, 0) : 8 + min(dc, 0)] = plane[
+        ..., max(-dr, 0) : 8 + min(-dr, 0), max(-dc, 0) : 8 + min(-dc, 0)
+    ]
+    return moved
+
+
+def piecePlane(board: np.ndarray, color: int, pieceType: int) -> np.ndarray:
+    """
+    Returns a bool plane of the squares holding the given piece.
+    """
+    return board == (color << 3 | pieceType)
+
+
+def attackCounts(board: np.ndarray, color: int) -> np.ndarray:
+    """
+    Counts the pieces of one colour attacking every square.
+
+    :Parameters:
+    - board: np.ndarray
+        int8 piece codes shaped (..., 8, 8).
+    - color: int
+        WHITE or BLACK, the attacking side.
+
+    :Returns:
+    - np.ndarray: int8 attacker counts shaped like board, > 0 is the attacked-square map.
+    """
+    counts = np.zeros(board.shape, dtype=np.int8)
+    empty = board == EMPTY
+    pawns = piecePlane(board, color, PAWN).astype(np.int8)
+    forward = PAWN_DIRECTIONS[color]
+    counts += shift(pawns, forward, -1) + shift(pawns, forward, 1)
+    for pieceType, steps in ((KNIGHT, KNIGHT_STEPS), (KING, KING_STEPS)):
+        plane = piecePlane(board, color, pieceType).astype(np.int8)
+        for dr, dc in steps:
+            counts += shift(plane, dr, dc)
+    queens = piecePlane(board, color, QUEEN)
+    for sliderType, steps in ((BISHOP, BISHOP_STEPS), (ROOK, ROOK_STEPS)):
+        sliders = piecePlane(board, color, sliderType) | queens
+        for dr, dc in steps:
+            # Walk every slider along the direction at once, a ray stops after the first piece.
+            ray = shift(sliders, dr, dc)
+            while ray.any():
+                counts += ray
+                ray = shift(ray & empty, dr, dc)
+    return counts
+
+
+def attackMap(board: np.ndarray, color: int) -> np.ndarray:
+    """
+    Returns a bool plane of the squares attacked by the pieces of one colour.
+    """
+    return attackCounts(board, color) > 0
+
+
+def mobility(board: np.ndarray, color: int) -> np.ndarray:
+    """
+    Counts the squares every piece of one colour can move to, ignoring checks, pins, castling
+    and en passant. A pawn counts its pushes and captures.
+
+    :Parameters:
+    - board: np.ndarray
+        int8 piece codes shaped (..., 8, 8).
+    - color: int
+        WHITE or BLACK.
+
+    :Returns:
+    - np.ndarray: int8 move counts on the squares of the pieces, 0 everywhere else.
+    """
+    counts = np.zeros(board.shape, dtype=np.int8)
+    empty = board == EMPTY
+    enemies = (board != EMPTY) & ((board >> 3) == 1 - color)
+    reachable = empty | enemies
+    # The value of a plane shifted by -step is the one of the square step away.
+    pawns = piecePlane(board, color, PAWN)
+    forward = PAWN_DIRECTIONS[color]
+    single = pawns & shift(empty, -forward, 0)
+    double = single & shift(empty, -2 * forward, 0) & START_ROWS[color]
+    counts += single
+    counts += double
+    counts += pawns & shift(enemies, -forward, 1)
+    counts += pawns & shift(enemies, -forward, -1)
+    for pieceType, steps in ((KNIGHT, KNIGHT_STEPS), (KING, KING_STEPS)):
+        plane = piecePlane(board, color, pieceType)
+        for dr, dc in steps:
+            counts += plane & shift(reachable, -dr, -dc)
+    queens = piecePlane(board, color, QUEEN)
+    for sliderType, steps in ((BISHOP, BISHOP_STEPS), (ROOK, ROOK_STEPS)):
+        sliders = piecePlane(board, color, sliderType) | queens
+        for dr, dc in steps:
+            # alive marks the sliders whose path is still open after distance - 1 steps.
+            alive = sliders
+            for distance in range(1, 8):
+                counts += alive & shift(reachable, -dr * distance, -dc * distance)
+                alive = alive & shift(empty, -dr * distance, -dc * distance)
+                if not alive.any():
+                    break
+    return counts
+
+
+def material(board: np.ndarray) -> np.ndarray:
+    """
+    Adds up the material of both sides, kings left out.
+
+    :Parameters:
+    - board: np.ndarray
+        int8 piece codes shaped (..., 8, 8).
+
+    :Returns:
+    - np.ndarray: int32 totals shaped (..., 2), white first, a pawn is 100.
+    """
+    values = MATERIAL_VALUES[board]
+    black = (board >> 3) == BLACK
+    return np.stack(
+        [
+            np.where(black, 0, values).sum(axis=(-2, -1)),
+            np.where(black, values, 0).sum(axis=(-2, -1)),
+        ],
+        axis=-1,
+    )
+
+
+def maskPlane(mask: int) -> np.ndarray:
+    """
+    Turns a bitboard into a bool plane shaped (8, 8).
+    """
+    return np.array([mask >> sq & 1 for sq in range(64)], dtype=bool).reshape(8, 8)
+
+
+# Room for the moves of one position in the batch results, no position has more than 218.
+MAX_MOVES: int = 256
+# Pawns that promote with their next step.
+PROMOTION_ROWS: np.ndarray = np.zeros((2, 8, 8), dtype=bool)
+PROMOTION_ROWS[WHITE, 1] = True
+PROMOTION_ROWS[BLACK, 6] = True
+# (right, packed move, path plane, crossed plane) of every castle, see bitboard.CASTLES.
+CASTLE_PLANES: tuple = tuple(
+    tuple(
+        (
+            right,
+            kingSq | to << 6 | moveType << 12,
+            maskPlane(path),
+            maskPlane(sum(1 << sq for sq in crossed)),
+        )
+        for right, kingSq, to, moveType, path, crossed in castles
+    )
+    for castles in CASTLES
+)
+# The Zobrist keys of bitboard as arrays, for hashing a whole batch at once.
+ZOBRIST_PIECE_KEYS: np.ndarray = np.array(ZOBRIST_PIECES, dtype=np.uint64)
+ZOBRIST_CASTLING_KEYS: np.ndarray = np.array(ZOBRIST_CASTLING, dtype=np.uint64)
+ZOBRIST_EN_PASSANT_KEYS: np.ndarray = np.array(ZOBRIST_EN_PASSANT + [0], dtype=np.uint64)
+
+
+def stackPositions(positions: list[Position]) -> tuple:
+    """
+    Stacks Position snapshots into the arrays the batch routines take.
+
+    :Parameters:
+    - positions: list[Position]
+        The snapshots, e.g. from GameState.snapshot.
+
+    :Returns:
+    - tuple: (boards (N, 8, 8) int8, colors (N,) int8, castling (N,) int8, en passant squares
+        (N,) int8).
+    """
+    boards = np.frombuffer(
+        b"".join(position.squares for position in positions), dtype=np.int8
+    ).reshape(-1, 8, 8)
+    colors, castling, enPassant = (
+        np.array(values, dtype=np.int8).reshape(-1)
+        for values in zip(*((pos.color, pos.castling, pos.enPassant) for pos in positions))
+    )
+    return boards, colors, castling, enPassant
+
+
+def batchHashes(
+    boards: np.ndarray,
+    colors: np.ndarray,
+    castling: np.ndarray,
+    enPassant: np.ndarray,
+) -> np.ndarray:
+    """
+    Works out the Zobrist keys of a batch of positions, the same ones BitBoard.computeHash gives.
+
+    :Parameters:
+    - boards: np.ndarray
+        int8 piece codes shaped (N, 8, 8).
+    - colors: np.ndarray
+        The side to move of every position, WHITE or BLACK.
+    - castling: np.ndarray
+        The castling rights mask of every position.
+    - enPassant: np.ndarray
+        The en passant square of every position, -1 if there is none.
+
+    :Returns:
+    - np.ndarray: uint64 keys shaped (N,).
+    """
+    flat = boards.reshape(len(boards), 64).astype(np.intp)
+    keys = np.bitwise_xor.reduce(ZOBRIST_PIECE_KEYS[flat, np.arange(64)], axis=1)
+    keys ^= np.where(colors == BLACK, np.uint64(ZOBRIST_BLACK), np.uint64(0))
+    keys ^= ZOBRIST_CASTLING_KEYS[castling.astype(np.intp)]
+    # Index 8 is the 0 key of "no en passant square".
+    files = np.where(enPassant >= 0, enPassant & 7, 8).astype(np.intp)
+    return keys ^ ZOBRIST_EN_PASSANT_KEYS[files]
+
+
+def firstBlockers(start: np.ndarray, empty: np.ndarray, dr: int, dc: int) -> np.ndarray:
+    """
+    Walks from every square of start along one direction and returns the first piece it meets.
+
+    :Parameters:
+    - start: np.ndarray
+        bool plane of the squares to walk from, shaped (N, 8, 8).
+    - empty: np.ndarray
+        bool plane of the empty squares.
+    - dr: int
+        Rows per step, negative is up the board.
+    - dc: int
+        Columns per step, negative is left.
+
+    :Returns:
+    - np.ndarray: bool plane of the pieces the walks stopped on.
+    """
+    blockers = np.zeros_like(start)
+    walk = start
+    for _ in range(7):
+        walk = shift(walk, dr, dc)
+        blockers |= walk & ~empty
+        walk &= empty
+        if not walk.any():
+            break
+    return blockers
+
+
+def pinnedRows(board: np.ndarray, color: int, king: np.ndarray) -> np.ndarray:
+    """
+    Finds the positions where a piece of one colour is pinned to its king, walking all 8 rays
+    away from the king of every position at once.
+
+    :Parameters:
+    - board: np.ndarray
+        int8 piece codes shaped (N, 8, 8).
+    - color: int
+        WHITE or BLACK, the side whose pieces can be pinned.
+    - king: np.ndarray
+        The bool plane of the king of that side, one king per position.
+
+    :Returns:
+    - np.ndarray: bool shaped (N,), True if the position has a pinned piece.
+    """
+    empty = board == EMPTY
+    own = ~empty & ((board >> 3) == color)
+    queens = piecePlane(board, 1 - color, QUEEN)
+    # The enemy sliders standing right behind the first piece of our own on a ray of the king.
+    pinners = np.zeros_like(king)
+    for sliderType, steps in ((BISHOP, BISHOP_STEPS), (ROOK, ROOK_STEPS)):
+        sliders = piecePlane(board, 1 - color, sliderType) | queens
+        for dr, dc in steps:
+            # The first piece on the ray if it's ours, then the first piece behind it.
+            shield = firstBlockers(king, empty, dr, dc) & own
+            pinners |= firstBlockers(shield, empty, dr, dc) & sliders
+    return pinners.reshape(len(board), 64).any(axis=1)
+
+
+def addMoves(
+    parts: list,
+    rows: np.ndarray,
+    fromPlane: np.ndarray,
+    dr: int,
+    dc: int,
+    flag: int = NORMAL,
+) -> None:
+    """
+    Packs a move for every square of fromPlane, the piece on it moving dr rows and dc columns.
+
+    :Parameters:
+    - parts: list
+        (batch rows, packed moves) arrays are appended here.
+    - rows: np.ndarray
+        The batch row of every board of fromPlane.
+    - fromPlane: np.ndarray
+        bool shaped (n, 8, 8), the pieces that make the move.
+    """
+    # Square index = row * 8 + col, so the flat index of a (n, 8, 8) plane is board * 64 + square.
+    index = np.flatnonzero(fromPlane)
+    fromSq = index & 63
+    toSq = fromSq + dr * 8 + dc
+    parts.append((rows[index >> 6], fromSq | toSq << 6 | flag << 12))
+
+
+def sideMoves(
+    boards: np.ndarray, color: int, castling: np.ndarray, rows: np.ndarray, parts: list
+) -> np.ndarray:
+    """
+    Generates the moves of one side for a batch of positions with that side to move, from the
+    target planes of every piece type. Without a check or a pin the only pseudo-legal moves
+    that are illegal are king moves onto attacked squares, so those positions are done here;
+    the rest are left to BitBoard.
+
+    :Parameters:
+    - boards: np.ndarray
+        int8 piece codes shaped (n, 8, 8).
+    - color: int
+        WHITE or BLACK, the side to move in every position.
+    - castling: np.ndarray
+        The castling rights mask of every position.
+    - rows: np.ndarray
+        The batch row of every position.
+    - parts: list
+        (batch rows, packed moves) arrays are appended here, see addMoves.
+
+    :Returns:
+    - np.ndarray: bool shaped (n,), True for the positions whose moves were generated.
+    """
+    king = piecePlane(boards, color, KING)
+    attacked = attackMap(boards, 1 - color)
+    done = (king.sum(axis=(1, 2)) == 1) & ~(king & attacked).any(axis=(1, 2))
+    done[done] &= ~pinnedRows(boards[done], color, king[done])
+    if not done.any():
+        return done
+    boards, castling, rows = boards[done], castling[done], rows[done]
+    king, attacked = king[done], attacked[done]
+    empty = boards == EMPTY
+    enemies = ~empty & ((boards >> 3) == 1 - color)
+    reachable = empty | enemies
+    # fromPlane & shift(targets, -dr, -dc) marks the pieces whose square dr, dc away is a target.
+    pawns = piecePlane(boards, color, PAWN)
+    forward = PAWN_DIRECTIONS[color]
+    single = pawns & shift(empty, -forward, 0)
+    double = single & shift(empty, -2 * forward, 0) & START_ROWS[color]
+    addMoves(parts, rows, double, 2 * forward, 0)
+    for plane, dc in (
+        (single, 0),
+        (pawns & shift(enemies, -forward, 1), -1),
+        (pawns & shift(enemies, -forward, -1), 1),
+    ):
+        promoting = plane & PROMOTION_ROWS[color]
+        addMoves(parts, rows, plane & ~promoting, forward, dc)
+        if promoting.any():
+            for flag in PROMOTION_FLAGS:
+                addMoves(parts, rows, promoting, forward, dc, flag)
+    knights = piecePlane(boards, color, KNIGHT)
+    for dr, dc in KNIGHT_STEPS:
+        addMoves(parts, rows, knights & shift(reachable, -dr, -dc), dr, dc)
+    safe = reachable & ~attacked
+    for dr, dc in KING_STEPS:
+        addMoves(parts, rows, king & shift(safe, -dr, -dc), dr, dc)
+    queens = piecePlane(boards, color, QUEEN)
+    for sliderType, steps in ((BISHOP, BISHOP_STEPS), (ROOK, ROOK_STEPS)):
+        sliders = piecePlane(boards, color, sliderType) | queens
+        for dr, dc in steps:
+            # alive marks the sliders whose path is still open after distance - 1 steps.
+            alive = sliders
+            for distance in range(1, 8):
+                addMoves(
+                    parts,
+                    rows,
+                    alive & shift(reachable, -dr * distance, -dc * distance),
+                    dr * distance,
+                    dc * distance,
+                )
+                alive = alive & shift(empty, -dr * distance, -dc * distance)
+                if not alive.any():
+                    break
+    # The king is not in check here, a castle needs its right, an empty path and safe squares.
+    for right, move, path, crossed in CASTLE_PLANES[color]:
+        allowed = (
+            (castling & right).astype(bool)
+            & ~(~empty & path).any(axis=(1, 2))
+            & ~(attacked & crossed).any(axis=(1, 2))
+        )
+        parts.append((rows[allowed], np.full(allowed.sum(), move, dtype=np.int64)))
+    return done
+
+
+def batchLegalMoves(
+    boards: np.ndarray,
+    colors: np.ndarray,
+    castling: np.ndarray | None = None,
+    enPassant: np.ndarray | None = None,
+) -> tuple:
+    """
+    Generates the legal moves of a batch of positions. The positions that are not in check, have
+    no pinned piece and no en passant square, which is most of them, get their moves from the
+    target planes of the whole batch at once (see sideMoves). Only the others are loaded into a
+    BitBoard one by one.
+
+    :Parameters:
+    - boards: np.ndarray
+        int8 piece codes shaped (N, 8, 8).
+    - colors: np.ndarray
+        The side to move of every position, WHITE or BLACK.
+    - castling: np.ndarray | None
+        The castling rights mask of every position, no castling if None.
+    - enPassant: np.ndarray | None
+        The en passant square of every position (-1 if there is none), none at all if None.
+
+    :Returns:
+    - tuple: (counts, moves). counts is int32 shaped (N,) with the number of legal moves,
+        moves is uint16 shaped (N, MAX_MOVES) with the packed moves (see bitboard.encodeMove)
+        of each position first and 0 after them. The order of the moves of a position is not
+        the one of BitBoard.genLegalMoves.
+    """
+    boards = np.ascontiguousarray(boards, dtype=np.int8)
+    count = len(boards)
+    colors = np.asarray(colors, dtype=np.int8)
+    if castling is None:
+        castling = np.zeros(count, dtype=np.int8)
+    if enPassant is None:
+        enPassant = np.full(count, -1, dtype=np.int8)
+    castling = np.asarray(castling, dtype=np.int8)
+    enPassant = np.asarray(enPassant, dtype=np.int8)
+    parts = []
+    done = np.zeros(count, dtype=bool)
+    for color in (WHITE, BLACK):
+        # En passant can take two pieces off a line at once, BitBoard handles those positions.
+        rows = np.flatnonzero((colors == color) & (enPassant < 0))
+        if len(rows):
+            done[rows] = sideMoves(boards[rows], color, castling[rows], rows, parts)
+    counts = np.zeros(count, dtype=np.int32)
+    moves = np.zeros((count, MAX_MOVES), dtype=np.uint16)
+    if parts:
+        rows = np.concatenate([part[0] for part in parts])
+        packed = np.concatenate([part[1] for part in parts])
+        order = np.argsort(rows, kind="stable")
+        rows, packed = rows[order], packed[order]
+        counts += np.bincount(rows, minlength=count).astype(np.int32)
+        # The slot of every move is its place among the moves of its position.
+        starts = np.cumsum(counts) - counts
+        moves[rows, np.arange(len(rows)) - starts[rows]] = packed
+    data = boards.tobytes()
+    for i in np.flatnonzero(~done).tolist():
+        # The hash is left at 0, move generation doesn't read it.
+        position = Position(
+            data[i * 64 : i * 64 + 64],
+            int(colors[i]),
+            int(castling[i]),
+            int(enPassant[i]),
+            0,
+            0,
+        )
+        legal = BitBoard.fromPosition(position).genLegalMoves()
+        counts[i] = len(legal)
+        moves[i, : len(legal)] = legal
+    return counts, moves
@@ -0,0 +1,1469 @@
+"""
+bitboard.py holds the bitboard position core behind ChessEngine.GameState. Every piece type and
+colour is stored as one 64-bit integer, square index = row * 8 + col (0 = a8, 63 = h1), which is
+the same layout as GameState.board.
+"""
+
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+from diagnostics import PERFT, trace
+
+WHITE: int = 0
+BLACK: int = 1
+
+# Pieces are small integer codes, colour << 3 | type, so the colour of a piece is code >> 3 and
+# its type is code & 7. EMPTY is the code of an empty square.
+EMPTY: int = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+# The name of every piece code, codes that are not a piece map to "__".
+PIECE_NAMES: list[str] = [
+    "__", "wP", "wN", "wB", "wR", "wQ", "wK", "__",
+    "__", "bP", "bN", "bB", "bR", "bQ", "bK", "__",
+]  # fmt: skip
+PIECE_CODES: dict[str, int] = {name: i for i, name in enumerate(PIECE_NAMES)}
+PIECE_CODES["__"] = EMPTY
+
+# Moves are packed into 16 bits: from square in bits 0-5, to square in bits 6-11 and the move flag
+# in bits 12-15. A promotion flag also tells the piece, PROMOTION + 0..3 for knight..queen.
+NORMAL: int = 0
+SHORT_CASTLE: int = 1
+LONG_CASTLE: int = 2
+EN_PASSANT: int = 3
+PROMOTION: int = 4
+PROMOTION_FLAGS: tuple = (
+    PROMOTION + QUEEN - KNIGHT,
+    PROMOTION + ROOK - KNIGHT,
+    PROMOTION + BISHOP - KNIGHT,
+    PROMOTION,
+)
+# Material values by piece type for the static exchange evaluation, index 0 is EMPTY.
+PIECE_VALUES: tuple = (0, 100, 320, 330, 500, 900, 20000)
+# Move generation stages: every move, captures and promotions, everything else.
+ALL_MOVES: int = 0
+CAPTURES: int = 1
+QUIETS: int = 2
+
+FULL: int = 0xFFFF_FFFF_FFFF_FFFF
+FILE_A: int = sum(1 << (row * 8) for row in range(8))
+FILE_B: int = FILE_A << 1
+FILE_G: int = FILE_A << 6
+FILE_H: int = FILE_A << 7
+NOT_FILE_A: int = FULL ^ FILE_A
+NOT_FILE_H: int = FULL ^ FILE_H
+NOT_FILE_AB: int = FULL ^ (FILE_A | FILE_B)
+NOT_FILE_GH: int = FULL ^ (FILE_G | FILE_H)
+RANK_8: int = 0xFF  # row 0
+RANK_6: int = 0xFF << 16  # black pawns land here after one step from their start
+RANK_3: int = 0xFF << 40  # white pawns land here after one step from their start
+RANK_1: int = 0xFF << 56  # row 7
+
+# Castling rights, one bit each in FEN order (KQkq).
+WHITE_KINGSIDE: int = 1
+WHITE_QUEENSIDE: int = 2
+BLACK_KINGSIDE: int = 4
+BLACK_QUEENSIDE: int = 8
+ALL_CASTLING: int = 15
+CASTLING_LETTERS: tuple = (
+    (WHITE_KINGSIDE, "K"),
+    (WHITE_QUEENSIDE, "Q"),
+    (BLACK_KINGSIDE, "k"),
+    (BLACK_QUEENSIDE, "q"),
+)
+# The rights that survive a move from or to each square, moving the king or a rook or capturing a
+# rook on its starting square takes the matching rights away.
+CASTLING_MASKS: list[int] = [ALL_CASTLING] * 64
+CASTLING_MASKS[0] ^= BLACK_QUEENSIDE  # a8
+CASTLING_MASKS[4] ^= BLACK_KINGSIDE | BLACK_QUEENSIDE  # e8
+CASTLING_MASKS[7] ^= BLACK_KINGSIDE  # h8
+CASTLING_MASKS[56] ^= WHITE_QUEENSIDE  # a1
+CASTLING_MASKS[60] ^= WHITE_KINGSIDE | WHITE_QUEENSIDE  # e1
+CASTLING_MASKS[63] ^= WHITE_KINGSIDE  # h1
+# (right, king start, king end, move type, squares that have to be empty, squares the king crosses)
+# for every castle of each colour.
+CASTLES: tuple = (
+    (
+        (WHITE_KINGSIDE, 60, 62, SHORT_CASTLE, (1 << 61) | (1 << 62), (61, 62)),
+        (WHITE_QUEENSIDE, 60, 58, LONG_CASTLE, (1 << 57) | (1 << 58) | (1 << 59), (59, 58)),
+    ),
+    (
+        (BLACK_KINGSIDE, 4, 6, SHORT_CASTLE, (1 << 5) | (1 << 6), (5, 6)),
+        (BLACK_QUEENSIDE, 4, 2, LONG_CASTLE, (1 << 1) | (1 << 2) | (1 << 3), (3, 2)),
+    ),
+)
+
+def encodeMove(fromSq: int, toSq: int, flag: int = NORMAL) -> int:
+    """
+    Packs a move into a 16-bit integer.
+
+    :Parameters:
+    - fromSq: int
+        The square index the piece moves from.
+    - toSq: int
+        The square index the piece moves to.
+    - flag: int
+        NORMAL, SHORT_CASTLE, LONG_CASTLE, EN_PASSANT or a promotion flag.
+
+    :Returns:
+    - int: The packed move.
+    """
+    return fromSq | toSq << 6 | flag << 12
+
+
+def decodeMove(move: int) -> tuple[int, int, int]:
+    """
+    Unpacks a move made by encodeMove into (from square, to square, flag).
+    """
+    return move & 63, move >> 6 & 63, move >> 12
+
+
+def promotionType(flag: int) -> int:
+    """
+    Returns the piece type a promotion flag promotes to, KNIGHT to QUEEN.
+    """
+    return flag - PROMOTION + KNIGHT
+
+
+def buildRays(step: int, mask: int) -> list[int]:
+    """
+    Builds the ray of every square in one direction on an empty board.
+
+    :Parameters:
+    - step: int
+        How much the square index changes with every step along the ray.
+    - mask: int
+        Bits that are still on the board after a step, throws away the ones that wrapped around.
+
+    :Returns:
+    - list[int]: The ray bitboard of every square, without the square itself.
+    """
+    rays = []
+    for sq in range(64):
+        ray = 0
+        bb = 1 << sq
+        while True:
+            bb = ((bb << step) if step > 0 else (bb >> -step)) & mask & FULL
+            if not bb:
+                break
+            ray |= bb
+        rays.append(ray)
+    return rays
+
+
+# The mask of every ray throws away bits that wrapped around the board edge. Rays with a positive
+# step (south and east) run towards higher square indexes.
+NORTH_RAYS: list[int] = buildRays(-8, FULL)
+SOUTH_RAYS: list[int] = buildRays(8, FULL)
+EAST_RAYS: list[int] = buildRays(1, NOT_FILE_A)
+WEST_RAYS: list[int] = buildRays(-1, NOT_FILE_H)
+NORTH_EAST_RAYS: list[int] = buildRays(-7, NOT_FILE_A)
+NORTH_WEST_RAYS: list[int] = buildRays(-9, NOT_FILE_H)
+SOUTH_EAST_RAYS: list[int] = buildRays(9, NOT_FILE_A)
+SOUTH_WEST_RAYS: list[int] = buildRays(7, NOT_FILE_H)
+ROOK_RAYS: tuple = (NORTH_RAYS, SOUTH_RAYS, EAST_RAYS, WEST_RAYS)
+BISHOP_RAYS: tuple = (NORTH_EAST_RAYS, NORTH_WEST_RAYS, SOUTH_EAST_RAYS, SOUTH_WEST_RAYS)
+
+# (row, col) of every square index, used when converting back to GameState tuples.
+SQUARES: list[tuple] = [(row, col) for row in range(8) for col in range(8)]
+
+
+def squareIndex(sq: tuple) -> int:
+    """
+    Converts a (row, col) tuple to a square index.
+    """
+    return sq[0] * 8 + sq[1]
+
+
+# The name of every square index, "a8" to "h1".
+SQUARE_NAMES: list[str] = ["abcdefgh"[col] + str(8 - row) for row, col in SQUARES]
+
+
+def moveToUci(move: int) -> str:
+    """
+    Writes a packed move in UCI notation, e.g. "e2e4", "e1g1" for a castle or "e7e8q".
+    """
+    flag = move >> 12
+    uci = SQUARE_NAMES[move & 63] + SQUARE_NAMES[move >> 6 & 63]
+    if flag >= PROMOTION:
+        uci += "nbrq"[flag - PROMOTION]
+    return uci
+
+
+def knightAttacks(bb: int) -> int:
+    """
+    Returns the squares attacked by knights standing on the squares of bb.
+    """
+    l1 = (bb >> 1) & NOT_FILE_H
+    l2 = (bb >> 2) & NOT_FILE_GH
+    r1 = (bb << 1) & NOT_FILE_A
+    r2 = (bb << 2) & NOT_FILE_AB
+    h1 = l1 | r1
+    h2 = l2 | r2
+    return ((h1 << 16) | (h1 >> 16) | (h2 << 8) | (h2 >> 8)) & FULL
+
+
+def kingAttacks(bb: int) -> int:
+    """
+    Returns the squares attacked by kings standing on the squares of bb.
+    """
+    row = bb | ((bb << 1) & NOT_FILE_A) | ((bb >> 1) & NOT_FILE_H)
+    return (row | (row << 8) | (row >> 8)) & FULL ^ bb
+
+
+def pawnAttacks(bb: int, color: int) -> int:
+    """
+    Returns the squares attacked by pawns of the given colour standing on the squares of bb.
+    """
+    if color == WHITE:
+        return ((bb >> 7) & NOT_FILE_A) | ((bb >> 9) & NOT_FILE_H)
+    return (((bb << 9) & NOT_FILE_A) | ((bb << 7) & NOT_FILE_H)) & FULL
+
+
+# Attack sets of the leaper pieces for every square, built once at import time so move generation
+# and check detection never redo the offsets and bounds checks.
+KNIGHT_ATTACKS: list[int] = [knightAttacks(1 << sq) for sq in range(64)]
+KING_ATTACKS: list[int] = [kingAttacks(1 << sq) for sq in range(64)]
+PAWN_ATTACKS: tuple = (
+    [pawnAttacks(1 << sq, WHITE) for sq in range(64)],
+    [pawnAttacks(1 << sq, BLACK) for sq in range(64)],
+)
+
+
+def slidingAttacks(
+    sq: int, occupied: int, positiveRays: tuple, negativeRays: tuple
+) -> int:
+    """
+    Cuts every ray from sq off behind the first piece that blocks it. The first blocker of a
+    positive ray is its lowest set bit, the first blocker of a negative ray is its highest one.
+
+    :Parameters:
+    - sq: int
+        The square index of the sliding piece.
+    - occupied: int
+        Bitboard of all the pieces on the board.
+    - positiveRays: tuple
+        The rays that run towards higher square indexes.
+    - negativeRays: tuple
+        The rays that run towards lower square indexes.
+
+    :Returns:
+    - int: Bitboard of the attacked squares, including the first blocker of every ray.
+    """
+    attacks = 0
+    for rays in positiveRays:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in negativeRays:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def buildLineTables(positiveRays: list[int], negativeRays: list[int]) -> tuple:
+    """
+    Builds the occupancy indexed attack tables of one line (rank, file or diagonal) for every
+    square. Only the squares that can block matter, so the last square of each ray is left out of
+    the mask and every subset of the mask gets an entry.
+
+    :Parameters:
+    - positiveRays: list[int]
+        The rays of the line that run towards higher square indexes.
+    - negativeRays: list[int]
+        The rays of the line that run towards lower square indexes.
+
+    :Returns:
+    - tuple: (masks, tables), the table of a square maps occupied & mask to the attacked squares.
+    """
+    masks = []
+    tables = []
+    for sq in range(64):
+        mask = negativeRays[sq] & (negativeRays[sq] - 1)
+        if positiveRays[sq]:
+            mask |= positiveRays[sq] ^ (1 << (positiveRays[sq].bit_length() - 1))
+        table = {}
+        # Walk every subset of the mask (carry-rippler).
+        subset = 0
+        while True:
+            table[subset] = slidingAttacks(sq, subset, (positiveRays,), (negativeRays,))
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+RANK_MASKS, RANK_TABLES = buildLineTables(EAST_RAYS, WEST_RAYS)
+FILE_MASKS, FILE_TABLES = buildLineTables(SOUTH_RAYS, NORTH_RAYS)
+DIAGONAL_MASKS, DIAGONAL_TABLES = buildLineTables(SOUTH_WEST_RAYS, NORTH_EAST_RAYS)
+ANTI_DIAGONAL_MASKS, ANTI_DIAGONAL_TABLES = buildLineTables(
+    SOUTH_EAST_RAYS, NORTH_WEST_RAYS
+)
+
+
+def rookAttacks(sq: int, occupied: int) -> int:
+    return (
+        RANK_TABLES[sq][occupied & RANK_MASKS[sq]]
+        | FILE_TABLES[sq][occupied & FILE_MASKS[sq]]
+    )
+
+
+def bishopAttacks(sq: int, occupied: int) -> int:
+    return (
+        DIAGONAL_TABLES[sq][occupied & DIAGONAL_MASKS[sq]]
+        | ANTI_DIAGONAL_TABLES[sq][occupied & ANTI_DIAGONAL_MASKS[sq]]
+    )
+
+
+def queenAttacks(sq: int, occupied: int) -> int:
+    return rookAttacks(sq, occupied) | bishopAttacks(sq, occupied)
+
+
+def buildBetween() -> list[list[int]]:
+    """
+    Builds the squares strictly between every pair of squares that share a rank, file or
+    diagonal, 0 for every pair that doesn't.
+    """
+    between = [[0] * 64 for _ in range(64)]
+    for rays in ROOK_RAYS + BISHOP_RAYS:
+        for sq in range(64):
+            ray = rays[sq]
+            while ray:
+                low = ray & -ray
+                to = low.bit_length() - 1
+                between[sq][to] = rays[sq] ^ rays[to] ^ low
+                ray ^= low
+    return between
+
+
+BETWEEN: list[list[int]] = buildBetween()
+
+# Zobrist keys, a fixed seed so a position has the same hash in every run and every process.
+zobristRandom = random.Random(0x5EED)
+# One key per piece code and square, the codes that are not a piece get 0.
+ZOBRIST_PIECES: list[list[int]] = [
+    [zobristRandom.getrandbits(64) if name != "__" else 0 for _ in range(64)]
+    for name in PIECE_NAMES
+]
+ZOBRIST_BLACK: int = zobristRandom.getrandbits(64)  # xored in when black is to move
+ZOBRIST_CASTLING: list[int] = [zobristRandom.getrandbits(64) for _ in range(16)]
+ZOBRIST_EN_PASSANT: list[int] = [zobristRandom.getrandbits(64) for _ in range(8)]  # by file
+
+
+class Position(NamedTuple):
+    """
+    An immutable snapshot of a position, small enough to keep around in bulk and to send to other
+    threads or processes. BitBoard.snapshot makes one, BitBoard.fromPosition rebuilds from it.
+
+    :Attributes:
+    - squares: bytes
+        The piece code on every square, see PIECE_NAMES.
+    - color: int
+        WHITE or BLACK, the side to move.
+    - castling: int
+        The castling rights mask.
+    - enPassant: int
+        The en passant square, -1 if there is none.
+    - halfMoves: int
+        Moves since the last capture or pawn move.
+    - hash: int
+        The Zobrist key of the position.
+    """
+
+    squares: bytes
+    color: int
+    castling: int
+    enPassant: int
+    halfMoves: int
+    hash: int
+
+
+class PerftStats:
+    def __init__(self, megabytes: float = 64):
+        """
+        The memory budget of a perft transposition table and the lookups made in it. On its own
+        it's what parallelDivide needs, the workers build their tables from the budget and their
+        probes and hits are added up here, so the parent process doesn't allocate any slots.
+
+        :Parameters:
+        - megabytes: float
+            The memory budget.
+
+        :Attributes:
+        - megabytes: float
+            The memory budget.
+        - probes: int
+            Lookups made since the table was built or cleared.
+        - hits: int
+            Lookups that found their entry.
+        """
+        self.megabytes = megabytes
+        self.probes = 0
+        self.hits = 0
+
+    @property
+    def hitRate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+
+class PerftTable(PerftStats):
+    # Rough size of one filled entry: two list slots, the key (hash and depth, a 72-bit int) and
+    # the count.
+    ENTRY_BYTES: int = 88
+
+    def __init__(self, megabytes: float = 64):
+        """
+        A fixed-size transposition table for perft, the leaf count of a position at a depth keyed
+        by its Zobrist hash. One entry per slot, a newer entry replaces whatever was there.
+
+        :Parameters:
+        - megabytes: float
+            The memory budget, the slot count is the largest power of two that fits.
+
+        :Attributes:
+        - size: int
+            The number of slots, a power of two.
+        - mask: int
+            size - 1, turns a hash into a slot index.
+        - keys: list[int]
+            hash << 8 | depth of the entry in every slot, -1 if the slot is empty.
+        - counts: list[int]
+            The leaf count of the entry in every slot.
+        """
+        super().__init__(megabytes)
+        entries = max(1, int(megabytes * 2**20) // self.ENTRY_BYTES)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Empties the table and resets the statistics.
+        """
+        self.keys = [-1] * self.size
+        self.counts = [0] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, hash: int, depth: int) -> int:
+        """
+        Looks up the leaf count of a position.
+
+        :Returns:
+        - int: The count, -1 if the table doesn't have it.
+        """
+        self.probes += 1
+        index = (hash ^ depth) & self.mask
+        if self.keys[index] == hash << 8 | depth:
+            self.hits += 1
+            return self.counts[index]
+        return -1
+
+    def store(self, hash: int, depth: int, count: int) -> None:
+        index = (hash ^ depth) & self.mask
+        self.keys[index] = hash << 8 | depth
+        self.counts[index] = count
+
+    @property
+    def filled(self) -> float:
+        """
+        The share of slots in use.
+        """
+        return 1 - self.keys.count(-1) / self.size
+
+
+# The transposition table of a perft worker process, built once per process by initPerftWorker.
+workerTable: PerftTable | None = None
+
+
+def initPerftWorker(megabytes: float) -> None:
+    global workerTable
+    workerTable = PerftTable(megabytes) if megabytes > 0 else None
+
+
+def perftTask(position: Position, depth: int) -> tuple[int, int, int]:
+    """
+    Runs perft on a subtree in a worker process.
+
+    :Returns:
+    - tuple[int, int, int]: The leaf nodes and the table probes and hits the subtree made.
+    """
+    if workerTable is None:
+        return BitBoard.fromPosition(position).perft(depth), 0, 0
+    probes, hits = workerTable.probes, workerTable.hits
+    nodes = BitBoard.fromPosition(position).perft(depth, workerTable)
+    return nodes, workerTable.probes - probes, workerTable.hits - hits
+
+
+class BitBoard:
+    def __init__(
+        self,
+        board: list,
+        isWhiteTurn: bool = True,
+        enPassant: int = -1,
+        halfMoves: int = 0,
+        castling: int = ALL_CASTLING,
+    ):
+        """
+        Builds the bitboards from a GameState style board.
+
+        :Attributes:
+        - pieces: list[int]
+            One bitboard per piece code, see PIECE_NAMES. The codes that are not a piece stay 0.
+        - squares: list[int]
+            The piece code on every square, EMPTY if there is none.
+        - occupancy: list[int]
+            Bitboard of all white pieces and all black pieces.
+        - occupied: int
+            Bitboard of every piece on the board.
+        - color: int
+            WHITE or BLACK, the side to move.
+        - enPassant: int
+            The square a pawn can capture en passant on, -1 if there is none.
+        - halfMoves: int
+            Moves since the last capture or pawn move, for the fifty-move rule.
+        - castling: int
+            The castling rights that are left, a mask of WHITE_KINGSIDE, WHITE_QUEENSIDE,
+            BLACK_KINGSIDE and BLACK_QUEENSIDE.
+        - hash: int
+            64-bit Zobrist key of the position: pieces, side to move, castling rights and the en
+            passant file. Kept up to date by every move, computeHash works it out from scratch.
+        - history: list[tuple]
+            One undo record per move made: (move, piece moved, piece captured, castling rights,
+            en passant square, half moves, hash), everything undoMove can't work out from the move.
+        """
+        squares = bytes(PIECE_CODES[piece] for row in board for piece in row)
+        color = WHITE if isWhiteTurn else BLACK
+        self.setPosition(Position(squares, color, castling, enPassant, halfMoves, 0))
+        self.hash = self.computeHash()
+
+    @classmethod
+    def fromPosition(cls, position: Position) -> "BitBoard":
+        """
+        Builds the bitboards of a snapshot without going through a string board.
+        """
+        bitboard = cls.__new__(cls)
+        bitboard.setPosition(position)
+        return bitboard
+
+    def setPosition(self, position: Position) -> None:
+        """
+        Puts the bitboards in the position of a snapshot, the move history starts over.
+
+        :Parameters:
+        - position: Position
+            The snapshot to restore, see snapshot.
+        """
+        self.pieces: list[int] = [0] * 16
+        self.squares: list[int] = list(position.squares)
+        self.occupancy: list[int] = [0, 0]
+        self.color: int = position.color
+        self.enPassant: int = position.enPassant
+        self.halfMoves: int = position.halfMoves
+        self.castling: int = position.castling
+        self.history: list[tuple] = []
+        self.hash: int = position.hash
+        for sq, piece in enumerate(self.squares):
+            if piece != EMPTY:
+                self.pieces[piece] |= 1 << sq
+                self.occupancy[piece >> 3] |= 1 << sq
+        self.occupied: int = self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def snapshot(self) -> Position:
+        """
+        Returns an immutable snapshot of the position, without the move history.
+        """
+        return Position(
+            bytes(self.squares),
+            self.color,
+            self.castling,
+            self.enPassant,
+            self.halfMoves,
+            self.hash,
+        )
+
+    def computeHash(self) -> int:
+        """
+        Works out the Zobrist key of the position from scratch.
+
+        :Returns:
+        - int: The 64-bit key, equal to hash as long as the incremental updates are right.
+        """
+        key = 0
+        for sq, piece in enumerate(self.squares):
+            key ^= ZOBRIST_PIECES[piece][sq]
+        if self.color == BLACK:
+            key ^= ZOBRIST_BLACK
+        key ^= ZOBRIST_CASTLING[self.castling]
+        if self.enPassant != -1:
+            key ^= ZOBRIST_EN_PASSANT[self.enPassant & 7]
+        return key
+
+    def hashIsConsistent(self) -> bool:
+        """
+        Checks the incrementally updated hash against computeHash.
+        """
+        return self.hash == self.computeHash()
+
+    def toBoard(self) -> list:
+        """
+        Renders the position as a GameState style board of piece name strings.
+        """
+        names = [PIECE_NAMES[piece] for piece in self.squares]
+        return [names[row * 8 : row * 8 + 8] for row in range(8)]
+
+    def repetitions(self) -> int:
+        """
+        Counts how many times the current position has been on the board, this time included.
+        Only the positions since the last capture or pawn move can be the same, and only every
+        second one has the same side to move, so that's all the hash history is scanned for.
+
+        :Returns:
+        - int: 1 if the position is new, 3 or more for a threefold repetition.
+        """
+        count = 1
+        history = self.history
+        # history[i] holds the hash of the position before move i, i.e. the one at ply i.
+        stop = max(len(history) - self.halfMoves, 0)
+        for ply in range(len(history) - 2, stop - 1, -2):
+            if history[ply][6] == self.hash:
+                count += 1
+        return count
+
+    def pieceSquares(self, piece: int) -> list[int]:
+        """
+        Returns the squares the given piece code stands on, only visiting its own bits.
+        """
+        squares = []
+        bb = self.pieces[piece]
+        while bb:
+            low = bb & -bb
+            squares.append(low.bit_length() - 1)
+            bb ^= low
+        return squares
+
+    def kingSquare(self, color: int) -> int:
+        return self.pieces[color << 3 | KING].bit_length() - 1
+
+    def isSquareAttacked(self, sq: int, byColor: int, occupied: int) -> bool:
+        """
+        Checks if any piece of byColor attacks sq, answered from the attack tables.
+
+        :Parameters:
+        - sq: int
+            The square index to test.
+        - byColor: int
+            WHITE or BLACK, the attacking side.
+        - occupied: int
+            The occupancy the sliders are blocked by, which doesn't have to be the current one,
+            e.g. without the king that is about to step away.
+
+        :Returns:
+        - bool: True if the square is attacked, False otherwise.
+        """
+        p = self.pieces
+        base = byColor << 3
+        return bool(
+            PAWN_ATTACKS[1 - byColor][sq] & p[base + PAWN]
+            or KNIGHT_ATTACKS[sq] & p[base + KNIGHT]
+            or KING_ATTACKS[sq] & p[base + KING]
+            or bishopAttacks(sq, occupied) & (p[base + BISHOP] | p[base + QUEEN])
+            or rookAttacks(sq, occupied) & (p[base + ROOK] | p[base + QUEEN])
+        )
+
+    def inCheck(self) -> bool:
+        return self.isSquareAttacked(
+            self.kingSquare(self.color), 1 - self.color, self.occupied
+        )
+
+    def attackersTo(self, sq: int, byColor: int, occupied: int) -> int:
+        """
+        Returns a bitboard of the pieces of byColor that attack sq with the given occupancy.
+        """
+        p = self.pieces
+        base = byColor << 3
+        return (
+            (PAWN_ATTACKS[1 - byColor][sq] & p[base + PAWN])
+            | (KNIGHT_ATTACKS[sq] & p[base + KNIGHT])
+            | (KING_ATTACKS[sq] & p[base + KING])
+            | (bishopAttacks(sq, occupied) & (p[base + BISHOP] | p[base + QUEEN]))
+            | (rookAttacks(sq, occupied) & (p[base + ROOK] | p[base + QUEEN]))
+        )
+
+    def pinRays(self, kingSq: int) -> dict[int, int]:
+        """
+        Finds the pieces of the side to move that are pinned to their king.
+
+        :Parameters:
+        - kingSq: int
+            The square of the king of the side to move.
+
+        :Returns:
+        - dict[int, int]: Square of every pinned piece mapped to the squares it may still move
+            to, the ray between the king and the pinner including the pinner.
+        """
+        p = self.pieces
+        us = self.color
+        them = 1 - us
+        theirs = self.occupancy[them]
+        # Sliders that would attack the king if none of our pieces were in the way.
+        pinners = (
+            rookAttacks(kingSq, theirs) & (p[them << 3 | ROOK] | p[them << 3 | QUEEN])
+        ) | (
+            bishopAttacks(kingSq, theirs)
+            & (p[them << 3 | BISHOP] | p[them << 3 | QUEEN])
+        )
+        pins = {}
+        while pinners:
+            low = pinners & -pinners
+            pinners ^= low
+            ray = BETWEEN[kingSq][low.bit_length() - 1]
+            blockers = ray & self.occupied
+            # Exactly one piece in between and it's ours.
+            if blockers & self.occupancy[us] and not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = ray | low
+        return pins
+
+    def legalMasks(self) -> tuple:
+        """
+        Works out what every generator of the side to move needs once per position.
+
+        :Returns:
+        - tuple: (king square, checkers, pins).
+        """
+        kingSq = self.kingSquare(self.color)
+        checkers = self.attackersTo(kingSq, 1 - self.color, self.occupied)
+        return kingSq, checkers, self.pinRays(kingSq)
+
+    def genLegalMoves(self, stage: int = ALL_MOVES) -> list:
+        """
+        Generates every legal move of the side to move in a single pass. The
+        checkers and the pin rays are worked out once, every generator only produces targets
+        inside them and a king in check goes through genEvasions instead.
+
+        :Parameters:
+        - stage: int
+            ALL_MOVES, CAPTURES for captures and promotions only or QUIETS for the rest.
+
+        :Returns:
+        - list: Packed moves, see encodeMove.
+        """
+        moves = []
+        self.genStage(stage, moves, *self.legalMasks())
+        return moves
+
+    def iterLegalMoves(self, stage: int = ALL_MOVES):
+        """
+        Yields the legal moves of the side to move lazily, captures and promotions first, then the
+        quiet moves. The quiet moves are only generated once the captures have all been taken, so
+        a consumer that stops early never pays for them. The position must not change while the
+        generator is running.
+
+        :Parameters:
+        - stage: int
+            ALL_MOVES for both stages, CAPTURES or QUIETS for just one of them.
+
+        :Yields:
+        - int: Packed moves, see encodeMove.
+        """
+        masks = self.legalMasks()
+        for part in (CAPTURES, QUIETS) if stage == ALL_MOVES else (stage,):
+            moves = []
+            self.genStage(part, moves, *masks)
+            yield from moves
+
+    def genStage(
+        self, stage: int, moves: list, kingSq: int, checkers: int, pins: dict[int, int]
+    ) -> None:
+        """
+        Appends the legal moves of one stage to moves, the masks come from legalMasks.
+        """
+        if checkers:
+            self.genEvasions(stage, moves, kingSq, checkers, pins)
+            return
+        p = self.pieces
+        us = self.color
+        base = us << 3
+        # The squares the moves of this stage may land on.
+        if stage == CAPTURES:
+            targets = self.occupancy[1 - us]
+        elif stage == QUIETS:
+            targets = FULL ^ self.occupied
+        else:
+            targets = FULL ^ self.occupancy[us]
+        self.kingMoves(kingSq, targets, moves)
+        if self.castling and stage != CAPTURES:
+            self.castleMoves(moves)
+        self.pawnMoves(moves, pins, stage)
+        for piece, generator in (
+            (KNIGHT, self.knightMoves),
+            (BISHOP, self.bishopMoves),
+            (ROOK, self.rookMoves),
+            (QUEEN, self.queenMoves),
+        ):
+            bb = p[base + piece]
+            while bb:
+                low = bb & -bb
+                sq = low.bit_length() - 1
+                generator(sq, targets & pins[sq] if sq in pins else targets, moves)
+                bb ^= low
+
+    def genEvasions(
+        self, stage: int, moves: list, kingSq: int, checkers: int, pins: dict[int, int]
+    ) -> None:
+        """
+        Generates the moves out of check: king moves, captures of the checker and interpositions
+        on the line between the checker and the king. Only the pieces that can reach those few
+        squares are looked at, in double check only the king moves.
+
+        :Parameters:
+        - stage: int
+            ALL_MOVES, CAPTURES for king captures, captures of the checker and promoting
+            interpositions, QUIETS for the rest.
+        - moves: list
+            The list to append the moves to.
+        - kingSq: int
+            The square of the king of the side to move.
+        - checkers: int
+            Bitboard of the pieces giving check.
+        - pins: dict[int, int]
+            The pin rays from pinRays.
+        """
+        p = self.pieces
+        us = self.color
+        them = 1 - us
+        base = us << 3
+        occupied = self.occupied
+        if stage == CAPTURES:
+            kingTargets = self.occupancy[them]
+        elif stage == QUIETS:
+            kingTargets = FULL ^ occupied
+        else:
+            kingTargets = FULL ^ self.occupancy[us]
+        self.kingMoves(kingSq, kingTargets, moves)
+        if checkers & (checkers - 1):
+            # Double check, only the king can move.
+            return
+        checkerSq = checkers.bit_length() - 1
+        # A pinned piece can't help, leaving its line to the king would be check again.
+        pinned = 0
+        for sq in pins:
+            pinned |= 1 << sq
+        free = self.occupancy[us] & ~pinned & ~(1 << kingSq)
+        pawns = p[base + PAWN]
+        promoRow = RANK_8 if us == WHITE else RANK_1
+        if stage != QUIETS:
+            # Capture the checker.
+            self.addEvasions(
+                self.attackersTo(checkerSq, us, occupied) & free, checkerSq, moves
+            )
+            if self.enPassant != -1:
+                # En passant can take a checking pawn or land on the check line, either way it's
+                # made and tested like in pawnMoves.
+                capturers = PAWN_ATTACKS[them][self.enPassant] & pawns
+                while capturers:
+                    low = capturers & -capturers
+                    capturers ^= low
+                    move = (low.bit_length() - 1) | self.enPassant << 6 | EN_PASSANT << 12
+                    self.makeMove(move)
+                    if not self.isSquareAttacked(kingSq, them, self.occupied):
+                        moves.append(move)
+                    self.undoMove()
+        # Block the line between a checking slider and the king, the squares on it are empty.
+        block = BETWEEN[kingSq][checkerSq]
+        while block:
+            bit = block & -block
+            to = bit.bit_length() - 1
+            block ^= bit
+            # Interpositions are quiet moves unless a pawn promotes on the way.
+            blockers = 0
+            if stage != CAPTURES:
+                blockers = (
+                    (KNIGHT_ATTACKS[to] & p[base + KNIGHT])
+                    | (bishopAttacks(to, occupied) & (p[base + BISHOP] | p[base + QUEEN]))
+                    | (rookAttacks(to, occupied) & (p[base + ROOK] | p[base + QUEEN]))
+                )
+            if stage != (QUIETS if bit & promoRow else CAPTURES):
+                # Pawns block with a push, one step or two from their starting rank.
+                if us == WHITE:
+                    blockers |= (bit << 8) & pawns
+                    if bit & (RANK_3 >> 8) and not (bit << 8) & occupied:
+                        blockers |= (bit << 16) & pawns
+                else:
+                    blockers |= (bit >> 8) & pawns
+                    if bit & (RANK_6 << 8) and not (bit >> 8) & occupied:
+                        blockers |= (bit >> 16) & pawns
+            self.addEvasions(blockers & free, to, moves)
+
+    def addEvasions(self, pieces: int, to: int, moves: list) -> None:
+        """
+        Appends a move to the square to from every piece of the side to move in pieces, pawns
+        reaching the last rank promote.
+        """
+        promotes = (1 << to) & (RANK_8 | RANK_1)
+        while pieces:
+            low = pieces & -pieces
+            sq = low.bit_length() - 1
+            pieces ^= low
+            if promotes and self.squares[sq] & 7 == PAWN:
+                for flag in PROMOTION_FLAGS:
+                    moves.append(sq | to << 6 | flag << 12)
+            else:
+                moves.append(sq | to << 6)
+
+    def addMoves(self, sq: int, targets: int, moves: list) -> None:
+        """
+        Appends a normal move from sq to every square of targets.
+        """
+        while targets:
+            low = targets & -targets
+            moves.append(sq | (low.bit_length() - 1) << 6)
+            targets ^= low
+
+    def pawnMoves(
+        self, moves: list, pins: dict[int, int], stage: int = ALL_MOVES
+    ) -> None:
+        """
+        Generates all legal pawn pushes, captures, en passant captures and promotions of the side
+        to move, which is not in check.
+
+        :Parameters:
+        - moves: list
+            The list to append the moves to.
+        - pins: dict[int, int]
+            The pin rays from pinRays.
+        - stage: int
+            ALL_MOVES, CAPTURES for captures, en passant and every promotion, QUIETS for the
+            pushes that don't promote.
+        """
+        us = self.color
+        them = 1 - us
+        pawns = self.pieces[us << 3 | PAWN]
+        empty = FULL ^ self.occupied
+        enemies = self.occupancy[them]
+        promoRow = RANK_8 if us == WHITE else RANK_1
+        # Pushes onto the last rank promote, so they belong to the captures stage.
+        if stage == CAPTURES:
+            pushMask = promoRow
+        elif stage == QUIETS:
+            pushMask = FULL ^ promoRow
+            enemies = 0
+        else:
+            pushMask = FULL
+        pinned = 0
+        for sq in pins:
+            pinned |= 1 << sq
+        pinned &= pawns
+        # The pawns that aren't pinned move all at once, one shift per direction, and every
+        # target bit is turned back into its pawn with the fixed distance of that direction.
+        free = pawns ^ pinned
+        if us == WHITE:
+            single = (free >> 8) & empty
+            double = ((single & RANK_3) >> 8) & empty
+            directions = (
+                (single & pushMask, 8),
+                (double & pushMask, 16),
+                ((free >> 9) & NOT_FILE_H & enemies, 9),
+                ((free >> 7) & NOT_FILE_A & enemies, 7),
+            )
+        else:
+            single = (free << 8) & empty
+            double = ((single & RANK_6) << 8) & empty
+            directions = (
+                (single & pushMask, -8),
+                (double & pushMask, -16),
+                ((free << 7) & NOT_FILE_H & enemies, -7),
+                ((free << 9) & NOT_FILE_A & enemies, -9),
+            )
+        for targets, back in directions:
+            while targets:
+                bit = targets & -targets
+                to = bit.bit_length() - 1
+                targets ^= bit
+                if bit & promoRow:
+                    for flag in PROMOTION_FLAGS:
+                        moves.append(to + back | to << 6 | flag << 12)
+                else:
+                    moves.append(to + back | to << 6)
+        # A pinned pawn can only move along its pin ray.
+        while pinned:
+            low = pinned & -pinned
+            sq = low.bit_length() - 1
+            pinned ^= low
+            if us == WHITE:
+                single = (low >> 8) & empty
+                double = ((single & RANK_3) >> 8) & empty
+            else:
+                single = (low << 8) & empty
+                double = ((single & RANK_6) << 8) & empty
+            targets = ((single | double) & pushMask) | (PAWN_ATTACKS[us][sq] & enemies)
+            targets &= pins[sq]
+            while targets:
+                bit = targets & -targets
+                to = bit.bit_length() - 1
+                targets ^= bit
+                if bit & promoRow:
+                    for flag in PROMOTION_FLAGS:
+                        moves.append(sq | to << 6 | flag << 12)
+                else:
+                    moves.append(sq | to << 6)
+        if stage != QUIETS and self.enPassant != -1:
+            # The pawns that attack the en passant square, pinned or not. En passant takes two
+            # pieces off a line at once, which the masks can't describe, so it's made and tested.
+            attackers = PAWN_ATTACKS[them][self.enPassant] & pawns
+            while attackers:
+                low = attackers & -attackers
+                attackers ^= low
+                move = low.bit_length() - 1 | self.enPassant << 6 | EN_PASSANT << 12
+                self.makeMove(move)
+                if not self.isSquareAttacked(self.kingSquare(us), them, self.occupied):
+                    moves.append(move)
+                self.undoMove()
+
+    def knightMoves(self, sq: int, targets: int, moves: list) -> None:
+        self.addMoves(sq, KNIGHT_ATTACKS[sq] & targets, moves)
+
+    def bishopMoves(self, sq: int, targets: int, moves: list) -> None:
+        self.addMoves(sq, bishopAttacks(sq, self.occupied) & targets, moves)
+
+    def rookMoves(self, sq: int, targets: int, moves: list) -> None:
+        self.addMoves(sq, rookAttacks(sq, self.occupied) & targets, moves)
+
+    def queenMoves(self, sq: int, targets: int, moves: list) -> None:
+        # The queen's moves are a combination of rook and bishop moves.
+        self.addMoves(sq, queenAttacks(sq, self.occupied) & targets, moves)
+
+    def kingMoves(self, sq: int, targets: int, moves: list) -> None:
+        """
+        Generates the king moves onto targets that don't step onto an attacked square. The king is
+        taken off the occupancy first so a slider checking it also covers the squares behind it.
+        """
+        them = 1 - self.color
+        occupied = self.occupied ^ (1 << sq)
+        targets &= KING_ATTACKS[sq]
+        while targets:
+            low = targets & -targets
+            to = low.bit_length() - 1
+            targets ^= low
+            if not self.isSquareAttacked(to, them, occupied):
+                moves.append(sq | to << 6)
+
+    def castleMoves(self, moves: list) -> None:
+        """
+        Generates the castles of the side to move, which must not be in check. A castle needs its
+        right, an empty path between king and rook and no attack on the squares the king crosses.
+        """
+        them = 1 - self.color
+        for right, kingSq, to, moveType, path, crossed in CASTLES[self.color]:
+            if (
+                self.castling & right
+                and not self.occupied & path
+                and not self.isSquareAttacked(crossed[0], them, self.occupied)
+                and not self.isSquareAttacked(crossed[1], them, self.occupied)
+            ):
+                moves.append(kingSq | to << 6 | moveType << 12)
+
+    def perft(self, depth: int, table: PerftTable | None = None, workers: int = 1) -> int:
+        """
+        Counts the leaf nodes of the legal move tree to the given depth, the standard check of a
+        move generator. The last ply is counted from the length of the move list without making
+        the moves.
+
+        :Parameters:
+        - depth: int
+            Plies to search, 0 counts the position itself.
+        - table: PerftTable
+            Optional, reuses the counts of transposed positions. Positions at depth 1 are not
+            stored, counting their moves is cheaper than a lookup. With workers a PerftStats is
+            enough, see parallelDivide.
+        - workers: int
+            Processes to split the tree over, see divide.
+
+        :Returns:
+        - int: The number of leaf nodes.
+        """
+        if workers > 1 and depth > 1:
+            return sum(self.parallelDivide(depth, workers, table).values())
+        if depth == 0:
+            return 1
+        if table is not None and depth > 1:
+            nodes = table.probe(self.hash, depth)
+            if nodes >= 0:
+                return nodes
+        moves = self.genLegalMoves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.makeMove(move)
+            nodes += self.perft(depth - 1, table)
+            self.undoMove()
+        if table is not None:
+            table.store(self.hash, depth, nodes)
+        return nodes
+
+    def divide(
+        self, depth: int, table: PerftTable | None = None, workers: int = 1
+    ) -> dict[int, int]:
+        """
+        Splits perft over the root moves, to find the move a wrong count comes from.
+
+        :Parameters:
+        - depth: int
+            Plies to search, the root move included.
+        - table: PerftTable
+            Optional, see perft.
+        - workers: int
+            Processes to split the tree over, see parallelDivide.
+
+        :Returns:
+        - dict[int, int]: The perft of depth - 1 after every packed root move.
+        """
+        if workers > 1 and depth > 1:
+            return self.parallelDivide(depth, workers, table)
+        counts = {}
+        for move in self.genLegalMoves():
+            self.makeMove(move)
+            counts[move] = self.perft(depth - 1, table)
+            self.undoMove()
+        return counts
+
+    def parallelDivide(
+        self, depth: int, workers: int, table: PerftStats | None = None
+    ) -> dict[int, int]:
+        """
+        divide with the subtrees counted in worker processes. The tree is split after the root
+        moves, or after the first two plies if there are too few root moves to keep the workers
+        busy. Every subtree goes out as a Position snapshot and its count is traced under
+        diagnostics.PERFT as it comes back.
+
+        :Parameters:
+        - depth: int
+            Plies to search, at least 2.
+        - workers: int
+            The number of worker processes.
+        - table: PerftStats
+            Optional, every worker gets its own table with an equal share of its memory budget
+            and the probes and hits of the workers are added to it. A PerftTable works too,
+            its slots stay empty.
+
+        :Returns:
+        - dict[int, int]: The perft of depth - 1 after every packed root move.
+        """
+        rootMoves = self.genLegalMoves()
+        counts = dict.fromkeys(rootMoves, 0)
+        plies = 2 if depth > 2 and len(rootMoves) < 8 * workers else 1
+        # (root move, moves from the root, snapshot at the end of them) of every subtree
+        subtrees = []
+        for move in rootMoves:
+            self.makeMove(move)
+            if plies == 1:
+                subtrees.append((move, (move,), self.snapshot()))
+            else:
+                for reply in self.genLegalMoves():
+                    self.makeMove(reply)
+                    subtrees.append((move, (move, reply), self.snapshot()))
+                    self.undoMove()
+            self.undoMove()
+        megabytes = table.megabytes / workers if table is not None else 0
+        with ProcessPoolExecutor(
+            workers, initializer=initPerftWorker, initargs=(megabytes,)
+        ) as pool:
+            futures = {
+                pool.submit(perftTask, position, depth - plies): (move, path)
+                for move, path, position in subtrees
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                move, path = futures[future]
+                nodes, probes, hits = future.result()
+                counts[move] += nodes
+                if table is not None:
+                    table.probes += probes
+                    table.hits += hits
+                trace(
+                    PERFT,
+                    "{}: {} ({}/{})",
+                    " ".join(moveToUci(m) for m in path),
+                    nodes,
+                    done,
+                    len(subtrees),
+                )
+        return counts
+
+    def isCapture(self, move: int) -> bool:
+        """
+        Checks if a move of the side to move takes a piece, en passant included.
+        """
+        return move >> 12 == EN_PASSANT or (
+            self.squares[move >> 6 & 63] != EMPTY
+            and move >> 12 not in (SHORT_CASTLE, LONG_CASTLE)
+        )
+
+    def isPromotion(self, move: int) -> bool:
+        return move >> 12 >= PROMOTION
+
+    def givesCheck(self, move: int) -> bool:
+        """
+        Checks if a legal move of the side to move checks the other king, from the attack tables
+        and the occupancy after the move, without making it.
+
+        :Parameters:
+        - move: int
+            A packed move, see encodeMove.
+
+        :Returns:
+        - bool: True if the move gives check, directly or by uncovering a slider.
+        """
+        fromSq = move & 63
+        toSq = move >> 6 & 63
+        flag = move >> 12
+        p = self.pieces
+        us = self.color
+        base = us << 3
+        kingSq = self.kingSquare(1 - us)
+        fromBit = 1 << fromSq
+        toBit = 1 << toSq
+        occupied = (self.occupied ^ fromBit) | toBit
+        # Our pieces that left their square, they can't uncover a check from there.
+        moved = fromBit
+        pieceType = self.squares[fromSq] & 7
+        if flag >= PROMOTION:
+            pieceType = flag - PROMOTION + KNIGHT
+        elif flag == EN_PASSANT:
+            # The captured pawn leaves the board too, which can open a line.
+            occupied ^= 1 << (toSq + (8 if us == WHITE else -8))
+        elif flag == SHORT_CASTLE or flag == LONG_CASTLE:
+            # Only the rook can give check, from the square next to the king.
+            rookFrom, rookTo = (
+                (fromSq + 3, fromSq + 1) if flag == SHORT_CASTLE else (fromSq - 4, fromSq - 1)
+            )
+            occupied ^= (1 << rookFrom) | (1 << rookTo)
+            moved |= 1 << rookFrom
+            if rookAttacks(kingSq, occupied) >> rookTo & 1:
+                return True
+        # Direct check from the moved piece on its new square.
+        if pieceType == PAWN:
+            if PAWN_ATTACKS[1 - us][kingSq] & toBit:
+                return True
+        elif pieceType == KNIGHT:
+            if KNIGHT_ATTACKS[kingSq] & toBit:
+                return True
+        elif pieceType == BISHOP:
+            if bishopAttacks(kingSq, occupied) & toBit:
+                return True
+        elif pieceType == ROOK:
+            if rookAttacks(kingSq, occupied) & toBit:
+                return True
+        elif pieceType == QUEEN:
+            if queenAttacks(kingSq, occupied) & toBit:
+                return True
+        # Discovered check from a slider that stayed where it was.
+        return bool(
+            (
+                (bishopAttacks(kingSq, occupied) & (p[base + BISHOP] | p[base + QUEEN]))
+                | (rookAttacks(kingSq, occupied) & (p[base + ROOK] | p[base + QUEEN]))
+            )
+            & ~moved
+        )
+
+    def see(self, move: int) -> int:
+        """
+        Static exchange evaluation of a move: plays out the captures on its target square, each
+        side always taking with its least valuable attacker and free to stop when that's better.
+        Sliders behind the pieces that already took part join in as the line opens up. Pins are
+        not looked at.
+
+        :Parameters:
+        - move: int
+            A packed move, see encodeMove.
+
+        :Returns:
+        - int: The material the side to move wins with the exchange, in PIECE_VALUES units.
+        """
+        fromSq = move & 63
+        toSq = move >> 6 & 63
+        flag = move >> 12
+        if flag == SHORT_CASTLE or flag == LONG_CASTLE:
+            return 0
+        p = self.pieces
+        us = self.color
+        occupied = self.occupied
+        attackerType = self.squares[fromSq] & 7
+        # gain[d] is what the side making capture d wins if the exchange stops after it.
+        gain = [PIECE_VALUES[self.squares[toSq] & 7]]
+        if flag == EN_PASSANT:
+            gain[0] = PIECE_VALUES[PAWN]
+            occupied ^= 1 << (toSq + (8 if us == WHITE else -8))
+        elif flag >= PROMOTION:
+            attackerType = flag - PROMOTION + KNIGHT
+            gain[0] += PIECE_VALUES[attackerType] - PIECE_VALUES[PAWN]
+        diagonal = p[BISHOP] | p[QUEEN] | p[BLACK << 3 | BISHOP] | p[BLACK << 3 | QUEEN]
+        straight = p[ROOK] | p[QUEEN] | p[BLACK << 3 | ROOK] | p[BLACK << 3 | QUEEN]
+        attackers = self.attackersTo(toSq, WHITE, occupied) | self.attackersTo(
+            toSq, BLACK, occupied
+        )
+        fromBit = 1 << fromSq
+        side = us
+        while True:
+            # The other side takes the piece that just captured.
+            gain.append(PIECE_VALUES[attackerType] - gain[-1])
+            if max(-gain[-2], gain[-1]) < 0:
+                # Neither side can do better by going on.
+                break
+            occupied ^= fromBit
+            if attackerType != KNIGHT:
+                # Sliders that were lined up behind the capturing piece.
+                attackers |= (bishopAttacks(toSq, occupied) & diagonal) | (
+                    rookAttacks(toSq, occupied) & straight
+                )
+            attackers &= occupied
+            side = 1 - side
+            fromBit = 0
+            for pieceType in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+                bb = attackers & p[side << 3 | pieceType]
+                if bb:
+                    fromBit = bb & -bb
+                    attackerType = pieceType
+                    break
+            if not fromBit:
+                break
+        # The last entry is only a guess, the capture it stands for never happened.
+        gain.pop()
+        # Each side picks between standing pat and capturing, from the back.
+        for d in range(len(gain) - 1, 0, -1):
+            gain[d - 1] = -max(-gain[d - 1], gain[d])
+        return gain[0]
+
+    def seeGE(self, move: int, threshold: int = 0) -> bool:
+        """
+        Checks if the static exchange evaluation of a move is at least threshold.
+        """
+        return self.see(move) >= threshold
+
+    def castleString(self) -> str:
+        """
+        Returns the castling rights in FEN format, e.g. "KQkq" or "-".
+        """
+        rights = "".join(
+            letter for right, letter in CASTLING_LETTERS if self.castling & right
+        )
+        return rights or "-"
+
+    def putPiece(self, piece: int, sq: int) -> None:
+        bit = 1 << sq
+        self.squares[sq] = piece
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+        self.pieces[piece] |= bit
+        self.occupancy[piece >> 3] |= bit
+        self.occupied |= bit
+
+    def removePiece(self, piece: int, sq: int) -> None:
+        bit = 1 << sq
+        self.squares[sq] = EMPTY
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+        self.pieces[piece] ^= bit
+        self.occupancy[piece >> 3] ^= bit
+        self.occupied ^= bit
+
+    def makeMove(self, move: int) -> None:
+        """
+        Executes a move on the bitboards.
+
+        :Parameters:
+        - move: int
+            A packed move, see encodeMove.
+        """
+        fromSq = move & 63
+        toSq = move >> 6 & 63
+        moveType = move >> 12
+        us = self.color
+        them = 1 - us
+        piece = self.squares[fromSq]
+        if moveType == EN_PASSANT:
+            capturedSq = toSq + (8 if us == WHITE else -8)
+        else:
+            capturedSq = toSq
+        captured = self.squares[capturedSq]
+        self.history.append(
+            (
+                move,
+                piece,
+                captured,
+                self.castling,
+                self.enPassant,
+                self.halfMoves,
+                self.hash,
+            )
+        )
+        # Take the old castling rights and en passant file out of the key, the new ones go back in
+        # once they're known.
+        self.hash ^= ZOBRIST_CASTLING[self.castling] ^ ZOBRIST_BLACK
+        if self.enPassant != -1:
+            self.hash ^= ZOBRIST_EN_PASSANT[self.enPassant & 7]
+        if captured != EMPTY:
+            self.removePiece(captured, capturedSq)
+        self.removePiece(piece, fromSq)
+        if moveType >= PROMOTION:
+            self.putPiece(us << 3 | moveType - PROMOTION + KNIGHT, toSq)
+        else:
+            self.putPiece(piece, toSq)
+        if moveType == SHORT_CASTLE:
+            self.removePiece(us << 3 | ROOK, fromSq + 3)
+            self.putPiece(us << 3 | ROOK, fromSq + 1)
+        elif moveType == LONG_CASTLE:
+            self.removePiece(us << 3 | ROOK, fromSq - 4)
+            self.putPiece(us << 3 | ROOK, fromSq - 1)
+        # A double pawn push leaves an en passant square behind it.
+        if piece & 7 == PAWN and abs(toSq - fromSq) == 16:
+            self.enPassant = (fromSq + toSq) // 2
+            self.hash ^= ZOBRIST_EN_PASSANT[toSq & 7]
+        else:
+            self.enPassant = -1
+        if piece & 7 == PAWN or captured != EMPTY:
+            self.halfMoves = 0
+        else:
+            self.halfMoves += 1
+        self.castling &= CASTLING_MASKS[fromSq] & CASTLING_MASKS[toSq]
+        self.hash ^= ZOBRIST_CASTLING[self.castling]
+        self.color = them
+
+    def undoMove(self) -> None:
+        """
+        Undoes the last move made on the bitboards.
+        """
+        (
+            move,
+            piece,
+            captured,
+            self.castling,
+            self.enPassant,
+            self.halfMoves,
+            hashBefore,
+        ) = self.history.pop()
+        fromSq = move & 63
+        toSq = move >> 6 & 63
+        moveType = move >> 12
+        self.color = us = 1 - self.color
+        if moveType == SHORT_CASTLE:
+            self.removePiece(us << 3 | ROOK, fromSq + 1)
+            self.putPiece(us << 3 | ROOK, fromSq + 3)
+        elif moveType == LONG_CASTLE:
+            self.removePiece(us << 3 | ROOK, fromSq - 1)
+            self.putPiece(us << 3 | ROOK, fromSq - 4)
+        if moveType >= PROMOTION:
+            self.removePiece(us << 3 | moveType - PROMOTION + KNIGHT, toSq)
+        else:
+            self.removePiece(piece, toSq)
+        self.putPiece(piece, fromSq)
+        if captured != EMPTY:
+            if moveType == EN_PASSANT:
+                toSq += 8 if us == WHITE else -8
+            self.putPiece(captured, toSq)
+        # Take the key from the record instead of undoing the castling and en passant parts.
+        self.hash = hashBefore
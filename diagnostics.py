@@ -0,0 +1,50 @@
+"""
+diagnostics.py is the trace output of the engine. Every message belongs to a category that can be
+switched on and off while running, a category that is off costs one set lookup and the message is
+never formatted or written.
+"""
+
+# Categories
+GAME: str = "game"  # game start, moves made and undone
+RESULT: str = "result"  # checkmate, stalemate and draws
+PERFT: str = "perft"  # progress of parallel perft, one message per finished subtree
+CATEGORIES: tuple = (GAME, RESULT, PERFT)
+
+# The categories that are on, all of them are off until something turns them on.
+enabled: set[str] = set()
+# Where the messages go, print unless replaced e.g. with a logger method.
+output = print
+
+
+def enable(*categories: str) -> None:
+    """
+    Turns the given categories on, every category if none are given.
+    """
+    enabled.update(categories or CATEGORIES)
+
+
+def disable(*categories: str) -> None:
+    """
+    Turns the given categories off, every category if none are given.
+    """
+    enabled.difference_update(categories or CATEGORIES)
+
+
+def isEnabled(category: str) -> bool:
+    return category in enabled
+
+
+def trace(category: str, message: str, *args) -> None:
+    """
+    Writes a message if its category is on.
+
+    :Parameters:
+    - category: str
+        One of CATEGORIES.
+    - message: str
+        The message, a str.format template if args are given.
+    - args:
+        The values for the template, only formatted when the category is on.
+    """
+    if category in enabled:
+        output(message.format(*args) if args else message)
@@ -13,6 +13,13 @@ NOTATION_COLOR: p.Color = p.Color(
     255, 255, 255, 255
 )  # Color for notation log on the side
 BACKGROUND_COLOR: p.color = p.Color(122, 122, 115)  # color for background
+# Text shown for every game ending GameState.gameUpdate reports.
+GAME_UPDATES: dict[str, str] = {
+    "GG": "CHECKMATE",
+    "SM": "STALEMATE",
+    "TR": "REPETITION",
+    "FM": "FIFTY MOVES",
+}
 
 
 class UI:
@@ -200,6 +207,140 @@ class UI:
                         ),
                     )
 
+    def pawnPromotion(self, move: list, screen: p.Surface, isWhiteTurn: bool) -> str:
+        """
+        Lets the player pick the piece a pawn promotes to when it reaches the opposite end of the
+        board, the engine gets the choice with the move.
+
+        :Parameters:
+        - move: list
+            The move being made, represented as a list of positions.
+        - screen:
+            The game screen to display the promotion options.
+        - isWhiteTurn: bool
+            True if a white pawn is promoting.
+
+        :Returns:
+        - str: The piece to promote to ('R', 'B', 'N', or 'Q').
+        """
+        running = True
+        p_names = [
+            "wR",
+            "wB",
+            "wN",
+            "wQ",
+            "bR",
+            "bB",
+            "bN",
+            "bQ",
+        ]  # Possible promotion pieces.
+        IMAGES = {}
+        font = p.font.SysFont("Arial", 15)  # Set the font for text display.
+        # Load images for promotion options.
+        for e in p_names:
+            IMAGES[e] = p.transform.scale(p.image.load("img/" + e + ".png"), (75, 75))
+        if isWhiteTurn:
+            # If it's white's turn, set up the promotion options for white.
+            shift = 75 * (move[0][1] - 4) if move[0][1] > 4 else 0
+            # Draw the promotion selection rectangle.
+            p.draw.rect(
+                screen,
+                (255, 204, 117),  # Background color.
+                (move[0][1] * 75 - shift, (move[0][0]) * 75 + 100, 4 * 75, 90),
+                border_radius=5,
+            )
+            p.draw.rect(
+                screen,
+                (0, 0, 0),  # Border color.
+                (move[0][1] * 75 - shift, (move[0][0]) * 75 + 100, 300, 90),
+                2,
+                5,
+            )
+            for i in range(4):
+                # Display each promotion option.
+                screen.blit(
+                    IMAGES[p_names[i]],  # The image of the piece.
+                    p.Rect(
+                        i * 75 + move[0][1] * 75 - 5 - shift,
+                        (move[0][0]) * 75 + 100,
+                        75,
+                        75,
+                    ),
+                )
+                f = font.render(
+                    str(i + 1), True, (0, 0, 0)
+                )  # Render the option number.
+                screen.blit(
+                    f,
+                    p.Rect(
+                        i * 75 + move[0][1] * 75 + 30 - shift,
+                        (move[0][0]) * 75 + 170,
+                        75,
+                        75,
+                    ),
+                )
+        else:
+            # If it's black's turn, set up the promotion options for black.
+            shift = 75 * (move[0][1] - 4) if move[0][1] > 4 else 0
+            # Draw the promotion selection rectangle.
+            p.draw.rect(
+                screen,
+                (255, 204, 117),  # Background color.
+                (move[0][1] * 75 - shift, (move[0][0]) * 75 - 100, 4 * 75, 90),
+                border_radius=5,
+            )
+            p.draw.rect(
+                screen,
+                (0, 0, 0),  # Border color.
+                (move[0][1] * 75 - shift, (move[0][0]) * 75 - 100, 300, 90),
+                2,
+                5,
+            )
+            for i in range(4, len(p_names)):
+                # Display each promotion option.
+                screen.blit(
+                    IMAGES[p_names[i]],  # The image of the piece.
+                    p.Rect(
+                        i * 75 + move[0][1] * 75 - 303 - shift,
+                        (move[0][0]) * 75 - 100,
+                        75,
+                        75,
+                    ),
+                )
+                f = font.render(
+                    str(i - 3), True, (0, 0, 0)
+                )  # Render the option number.
+                screen.blit(
+                    f,
+                    p.Rect(
+                        i * 75 + move[0][1] * 75 - 268.5 - shift,
+                        (move[0][0]) * 75 - 28,
+                        75,
+                        75,
+                    ),
+                )
+        p.display.flip()  # Update the display.
+        while running:
+            for e in p.event.get():
+                if e.type == p.QUIT:
+                    running = False
+                    exit("QUIT")  # Exit the game.
+                elif e.type == p.KEYDOWN or e.type == p.KEYUP:
+                    # Handle user input for promotion selection.
+                    if e.key == p.K_1:
+                        running = False
+                        return "R"  # Promote to Rook.
+                    elif e.key == p.K_2:
+                        running = False
+                        return "B"  # Promote to Bishop.
+                    elif e.key == p.K_3:
+                        running = False
+                        return "N"  # Promote to Knight.
+                    elif e.key == p.K_4:
+                        running = False
+                        return "Q"  # Promote to Queen.
+        return
+
     def drawNotationLog(
         self,
         screen: p.Surface,
@@ -246,12 +387,10 @@ class UI:
             y1 = y + (20 * (i // 2))
             x1 = x + (60 * leftOrRight)
             screen.blit(notation, (x1, y1))
-        # Need to let to user know that its a mate or a stalemate
+        # Need to let to user know that its a mate, a stalemate or a draw
         if gameUpdate:
             font = p.font.SysFont("Arial", 20)
-            update = font.render(
-                "CHECKMATE" if gameUpdate == "GG" else "STALEMATE", True, NOTATION_COLOR
-            )
+            update = font.render(GAME_UPDATES[gameUpdate], True, NOTATION_COLOR)
             screen.blit(
                 update,
                 (
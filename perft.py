@@ -0,0 +1,382 @@
+"""
+perft.py checks and times the move generation. It counts the leaf nodes of the legal move tree of
+reference positions, compares them with their known counts and reports the nodes per second.
+
+    python perft.py                                  # the reference suite to depth 3
+    python perft.py --depth 5                        # deeper, as far as the known counts go
+    python perft.py --fen "<fen>" --depth 4 --divide # one position, split over its root moves
+    python perft.py --depth 5 --hash 256             # reuse transposed positions, 256 MB table
+    python perft.py --depth 5 --workers 8 --progress # split over 8 processes, count every subtree
+    python perft.py --depth 3 --check-hash           # check the Zobrist hash after every move
+
+The suite also checks the static exchange evaluation of a few positions against their known
+values, BitBoard.givesCheck against making every move of the reference trees and the draw
+detection of GameState.gameUpdate on a few short games.
+"""
+
+import argparse
+import sys
+import time
+import ChessEngine
+import diagnostics
+from bitboard import BitBoard, PerftStats, PerftTable, moveToUci
+
+# (name, FEN, known leaf counts for depth 1, 2, 3, ...)
+SUITE: list[tuple] = [
+    (
+        "initial",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        [20, 400, 8902, 197281, 4865609],
+    ),
+    (
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603],
+    ),
+    # En passant edge cases, e.g. a capture that would leave the king in check along the rank.
+    (
+        "en passant",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624],
+    ),
+    # Promotions with and without capture, checks and castling rights lost to captures.
+    (
+        "promotion",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333],
+    ),
+    (
+        "position 5",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487],
+    ),
+    (
+        "position 6",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594],
+    ),
+]
+
+# (FEN, move in UCI notation, its static exchange evaluation in bitboard.PIECE_VALUES units)
+SEE_SUITE: list[tuple] = [
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "e1e5", 100),
+    # The knight takes a pawn defended twice, every piece joins in behind the one in front.
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "d3e5", -220),
+    ("4k3/8/8/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5", 100),
+    ("4k3/8/4p3/3p4/4P3/8/8/4K3 w - - 0 1", "e4d5", 0),
+    ("4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1", "d1d5", -800),
+    ("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 100),
+    ("4k3/1P6/8/8/8/8/8/4K3 w - - 0 1", "b7b8q", 800),
+    # The rook behind the first one wins the exchange back.
+    ("3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1", "d2d5", 100),
+]
+
+# (name, FEN, moves in UCI notation, gameUpdate after the last one, "" before it)
+DRAW_SUITE: list[tuple] = [
+    (
+        "repetition",
+        "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        ["g1f3", "g8f6", "f3g1", "f6g8", "g1f3", "g8f6", "f3g1", "f6g8"],
+        "TR",
+    ),
+    ("fifty moves", "4k3/8/8/8/8/8/8/R3K3 w - - 99 80", ["a1a2"], "FM"),
+    # A capture on the hundredth half move starts the count over.
+    ("capture", "4k3/8/8/8/8/8/r7/R3K3 w - - 99 80", ["a1a2"], ""),
+    # Checkmate on the hundredth half move wins, it isn't a draw.
+    ("mate first", "7k/8/6K1/8/8/8/8/R7 w - - 99 80", ["a1a8"], "GG"),
+]
+
+
+def findMove(bitboard: BitBoard, uci: str) -> int:
+    """
+    Returns the packed legal move with the given UCI notation.
+
+    :Raises:
+    - AssertionError: If no legal move has that notation.
+    """
+    for move in bitboard.genLegalMoves():
+        if moveToUci(move) == uci:
+            return move
+    raise AssertionError(f"{uci} is not a legal move")
+
+
+def runSee() -> bool:
+    """
+    Checks BitBoard.see and BitBoard.seeGE on the positions of SEE_SUITE.
+
+    :Returns:
+    - bool: True if every value matches.
+    """
+    passed = True
+    for fen, uci, value in SEE_SUITE:
+        bitboard = ChessEngine.GameState.fromFEN(fen).bitboard
+        move = findMove(bitboard, uci)
+        see = bitboard.see(move)
+        ok = see == value and bitboard.seeGE(move, value) and not bitboard.seeGE(move, value + 1)
+        passed = passed and ok
+        if not ok:
+            print(f"see {uci:<6} {see:>5}  FAIL, expected {value} in {fen}")
+    print(f"{'see':<12} {len(SEE_SUITE)} positions  " + ("OK" if passed else "FAIL"))
+    return passed
+
+
+def runDraws() -> bool:
+    """
+    Plays the games of DRAW_SUITE and checks gameUpdate after every move.
+
+    :Returns:
+    - bool: True if every game ends with its expected status and none ends early.
+    """
+    passed = True
+    for name, fen, moves, expected in DRAW_SUITE:
+        gameState = ChessEngine.GameState.fromFEN(fen)
+        statuses = []
+        for uci in moves:
+            gameState.push(findMove(gameState.bitboard, uci))
+            statuses.append(gameState.gameUpdate)
+        ok = statuses == [""] * (len(moves) - 1) + [expected]
+        passed = passed and ok
+        if not ok:
+            print(f"draw {name:<12} {statuses}  FAIL, expected {expected!r} after the last move")
+    print(f"{'draws':<12} {len(DRAW_SUITE)} games  " + ("OK" if passed else "FAIL"))
+    return passed
+
+
+def checkedGivesCheck(bitboard: BitBoard, depth: int, path: tuple = ()) -> int:
+    """
+    Walks the legal move tree to the given depth and compares BitBoard.givesCheck of every move
+    with making it and looking at the king.
+
+    :Returns:
+    - int: The number of checking moves seen.
+
+    :Raises:
+    - AssertionError: If givesCheck is wrong, with the moves that led to it.
+    """
+    checks = 0
+    for move in bitboard.genLegalMoves():
+        expected = bitboard.givesCheck(move)
+        bitboard.makeMove(move)
+        if bitboard.inCheck() != expected:
+            raise AssertionError(
+                f"givesCheck wrong for {' '.join(map(moveToUci, path + (move,)))}"
+            )
+        checks += expected
+        if depth > 1:
+            checks += checkedGivesCheck(bitboard, depth - 1, path + (move,))
+        bitboard.undoMove()
+    return checks
+
+
+def runGivesCheck(depth: int) -> bool:
+    """
+    Runs checkedGivesCheck on every reference position.
+
+    :Returns:
+    - bool: True if givesCheck agrees everywhere.
+    """
+    checks = 0
+    try:
+        for name, fen, counts in SUITE:
+            checks += checkedGivesCheck(ChessEngine.GameState.fromFEN(fen).bitboard, depth)
+    except AssertionError as error:
+        print(f"{'gives check':<12} FAIL, {error} in {name}")
+        return False
+    print(f"{'gives check':<12} depth {depth}  {checks:>10} checks  OK")
+    return True
+
+
+def checkedPerft(bitboard: BitBoard, depth: int, path: tuple = ()) -> int:
+    """
+    perft that makes every move, the last ply included, and checks the incrementally updated
+    hash against BitBoard.hashIsConsistent after every make and undo. Much slower than perft,
+    it's there to catch hash regressions.
+
+    :Parameters:
+    - bitboard: BitBoard
+        The position to count from.
+    - depth: int
+        Plies to search.
+    - path: tuple
+        The moves made to get here, for the error message.
+
+    :Returns:
+    - int: The number of leaf nodes.
+
+    :Raises:
+    - AssertionError: If the hash is wrong, with the moves that led to it.
+    """
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in bitboard.genLegalMoves():
+        bitboard.makeMove(move)
+        if not bitboard.hashIsConsistent():
+            raise AssertionError(f"hash wrong after {' '.join(map(moveToUci, path + (move,)))}")
+        nodes += checkedPerft(bitboard, depth - 1, path + (move,))
+        bitboard.undoMove()
+        if not bitboard.hashIsConsistent():
+            raise AssertionError(
+                f"hash wrong after undoing {' '.join(map(moveToUci, path + (move,)))}"
+            )
+    return nodes
+
+
+def timedPerft(
+    gameState: ChessEngine.GameState,
+    depth: int,
+    table: PerftStats | None = None,
+    workers: int = 1,
+    checkHash: bool = False,
+) -> tuple[int, float]:
+    """
+    Runs perft and times it, with the transposition table if one is given and over the given
+    number of processes, or checkedPerft if checkHash is set.
+
+    :Returns:
+    - tuple[int, float]: The leaf nodes and the seconds it took.
+    """
+    start = time.perf_counter()
+    if checkHash:
+        nodes = checkedPerft(gameState.bitboard, depth)
+    else:
+        nodes = gameState.perft(depth, table, workers)
+    return nodes, time.perf_counter() - start
+
+
+def runSuite(
+    depth: int,
+    table: PerftStats | None = None,
+    workers: int = 1,
+    checkHash: bool = False,
+) -> bool:
+    """
+    Runs every reference position to the given depth, or as deep as its known counts go.
+
+    :Returns:
+    - bool: True if every count matches.
+    """
+    passed = True
+    totalNodes = 0
+    totalTime = 0.0
+    for name, fen, counts in SUITE:
+        gameState = ChessEngine.GameState.fromFEN(fen)
+        for d in range(1, min(depth, len(counts)) + 1):
+            nodes, seconds = timedPerft(gameState, d, table, workers, checkHash)
+            totalNodes += nodes
+            totalTime += seconds
+            ok = nodes == counts[d - 1]
+            passed = passed and ok
+            print(
+                f"{name:<12} depth {d}  {nodes:>10} nodes  {nodes / max(seconds, 1e-9):>10.0f} nps  "
+                + ("OK" if ok else f"FAIL, expected {counts[d - 1]}")
+            )
+    print(
+        f"{'total':<12}          {totalNodes:>10} nodes  "
+        f"{totalNodes / max(totalTime, 1e-9):>10.0f} nps  {totalTime:.2f} s"
+    )
+    reportTable(table)
+    passed = runSee() and passed
+    passed = runDraws() and passed
+    # Making every move is slow, three plies already see every kind of check.
+    return runGivesCheck(min(depth, 3)) and passed
+
+
+def reportTable(table: PerftStats | None) -> None:
+    """
+    Prints the hit rate of the transposition table, if there is one, and its fill. A PerftStats
+    only has the lookups of the worker tables.
+    """
+    if isinstance(table, PerftTable):
+        print(
+            f"hash table: {table.size} entries  {table.probes} probes  "
+            f"{table.hitRate:.1%} hits  {table.filled:.1%} filled"
+        )
+    elif table is not None:
+        print(
+            f"hash tables: {table.megabytes:g} MB over the workers  {table.probes} probes  "
+            f"{table.hitRate:.1%} hits"
+        )
+
+
+def runDivide(
+    gameState: ChessEngine.GameState,
+    depth: int,
+    table: PerftStats | None = None,
+    workers: int = 1,
+    checkHash: bool = False,
+) -> None:
+    """
+    Prints the leaf nodes under every root move and their sum.
+    """
+    start = time.perf_counter()
+    if checkHash:
+        bitboard = gameState.bitboard
+        counts = {}
+        for move in bitboard.genLegalMoves():
+            bitboard.makeMove(move)
+            counts[moveToUci(move)] = checkedPerft(bitboard, depth - 1, (move,))
+            bitboard.undoMove()
+    else:
+        counts = gameState.divide(depth, table, workers)
+    seconds = time.perf_counter() - start
+    for move in sorted(counts):
+        print(f"{move}: {counts[move]}")
+    nodes = sum(counts.values())
+    print(f"\nmoves {len(counts)}  nodes {nodes}  {nodes / max(seconds, 1e-9):.0f} nps")
+    reportTable(table)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft of the move generation.")
+    parser.add_argument("--depth", type=int, default=3, help="plies to search")
+    parser.add_argument("--fen", help="a position to run instead of the reference suite")
+    parser.add_argument(
+        "--divide", action="store_true", help="split the count over the root moves"
+    )
+    parser.add_argument(
+        "--hash",
+        type=float,
+        default=0,
+        metavar="MB",
+        help="memory budget of a transposition table in megabytes, 0 runs without one",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="processes to split the tree over"
+    )
+    parser.add_argument(
+        "--progress", action="store_true", help="print the count of every subtree of --workers"
+    )
+    parser.add_argument(
+        "--check-hash",
+        action="store_true",
+        help="check the incremental hash against a recomputation after every move, slow, runs"
+        " without --hash and --workers",
+    )
+    args = parser.parse_args(argv)
+    if args.progress:
+        diagnostics.enable(diagnostics.PERFT)
+    table = None
+    if args.hash > 0 and not args.check_hash:
+        # The workers build their own tables, the parent only needs the budget and the stats.
+        table = PerftStats(args.hash) if args.workers > 1 else PerftTable(args.hash)
+    try:
+        if args.fen is None and not args.divide:
+            return 0 if runSuite(args.depth, table, args.workers, args.check_hash) else 1
+        gameState = ChessEngine.GameState.fromFEN(args.fen or SUITE[0][1])
+        if args.divide:
+            runDivide(gameState, args.depth, table, args.workers, args.check_hash)
+            return 0
+        nodes, seconds = timedPerft(
+            gameState, args.depth, table, args.workers, args.check_hash
+        )
+    except AssertionError as error:
+        print(f"FAIL, {error}")
+        return 1
+    print(f"nodes {nodes}  {nodes / max(seconds, 1e-9):.0f} nps  {seconds:.2f} s")
+    reportTable(table)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
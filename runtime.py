@@ -5,6 +5,7 @@ Main.py file is responsible for running the game engine. It handles user input a
 import pygame as p
 import pygame.font
 import ChessEngine
+import diagnostics
 from Interface import UI
 import inspect
 import sys
@@ -21,6 +22,7 @@ MOVEHINT = True
 
 # Global Game Values
 CLOCK: p.time.Clock = None  # Clock object to manage game updates.
+diagnostics.enable(diagnostics.GAME, diagnostics.RESULT)  # Game log on the console.
 GameState: ChessEngine.GameState = ChessEngine.GameState()  # Initialize the game state.
 FirstMoveWhite: bool = GameState.isWhiteTurn
 MultiPV: int = 2
@@ -359,12 +361,13 @@ def handlePawnPromotion(
     )
     if not promote:
         # Prompt the player for the piece to promote to.
-        promote = GameState.pawnPromotion(
+        promote = ui.pawnPromotion(
             (
                 (userClicks[1][0], userClicks[1][1]),
                 (userClicks[0][0], userClicks[0][1]),
             ),
             screen,
+            GameState.isWhiteTurn,
         )
     move = ChessEngine.Move(
         (userClicks[0], userClicks[1]),